@@ -0,0 +1,115 @@
+"""
+Tail latency of the QA pipeline under provider slowness, with and without a request
+deadline, and the degradations the deadline costs.
+
+Providers are simulated by a mock HTTP transport with heavy tailed latencies: most calls
+are fast, a few stall for several seconds. The fast pipeline is used because its stages
+are plain coroutines; run_qa_with_deadline applies the same budgets to the chain.
+All latencies, the SLA and the stage budgets are multiplied by --scale so the benchmark
+runs in seconds; reported numbers are scaled back to real seconds.
+
+Usage (from applications/serverless-chat):
+    python -m benchmarks.bench_deadline --requests 200 --sla 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+
+from chat_app import deadline as dl  # noqa: E402
+from chat_app import fast_qa  # noqa: E402
+
+QUESTIONS = [item["question"] for item in json.loads((Path(__file__).parent / "confluence_questions.json").read_text())]
+MATCHES = [{"id": "a", "score": 0.8, "metadata": {"text": "Context chunk. " * 40, "source_url": "https://wiki/a"}}]
+ANSWER_TOKENS = 60
+
+
+class SlowProviders:
+    """Heavy tailed latencies per call: lognormal around the median, and a stall with probability stall_rate."""
+
+    def __init__(self, scale: float, stall_rate: float, seed: int = 0):
+        self.scale = scale
+        self.stall_rate = stall_rate
+        self.random = random.Random(seed)
+
+    def delay(self, median: float, stall: float) -> float:
+        seconds = stall if self.random.random() < self.stall_rate else median * self.random.lognormvariate(0, 0.5)
+        return seconds * self.scale
+
+    async def handler(self, request: httpx.Request):
+        body = json.loads(request.content)
+        path = request.url.path
+        if path.endswith("/chat/completions") and body.get("stream"):
+            return httpx.Response(200, content=self.answer_stream(self.delay(1.5, 20) / ANSWER_TOKENS))
+        if path.endswith("/chat/completions"):
+            rewrite = body["messages"][0]["role"] == "user"
+            await asyncio.sleep(self.delay(0.5, 15) if rewrite else self.delay(1.5, 20))
+            return httpx.Response(200, json={"choices": [{"message": {"content": "answer " * ANSWER_TOKENS}}]})
+        if path.endswith("/embeddings"):
+            await asyncio.sleep(self.delay(0.1, 5))
+            return httpx.Response(200, json={"data": [{"embedding": [0.1] * 8}]})
+        await asyncio.sleep(self.delay(0.2, 10))
+        return httpx.Response(200, json={"matches": MATCHES})
+
+    @staticmethod
+    async def answer_stream(token_delay: float):
+        for _ in range(ANSWER_TOKENS):
+            await asyncio.sleep(token_delay)
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': 'answer '}}]})}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(requests: int, sla: float, scale: float, stall_rate: float, with_deadline: bool):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(SlowProviders(scale, stall_rate).handler))
+    latencies = []
+    for i in range(requests):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        started = time.perf_counter()
+        if with_deadline:
+            await fast_qa.answer_question_with_deadline(question, client, dl.Deadline(sla * scale))
+        else:
+            await fast_qa.answer_question(question, client)
+        latencies.append((time.perf_counter() - started) / scale)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sla", type=float, default=10, help="Request deadline in seconds")
+    parser.add_argument("--stall-rate", type=float, default=0.05, help="Share of provider calls that stall")
+    parser.add_argument("--scale", type=float, default=0.02, help="Time scale of the simulation")
+    args = parser.parse_args()
+
+    fast_qa._index_host = "bench.local"
+    for name in ("REWRITE_BUDGET_S", "RETRIEVE_BUDGET_S", "ANSWER_MIN_S", "MIN_STAGE_S", "TIGHT_DEADLINE_S"):
+        setattr(dl, name, getattr(dl, name) * args.scale)
+
+    print(f"{args.requests} requests, {args.stall_rate:.0%} stalled provider calls, SLA {args.sla:.0f}s")
+    print(f"{'mode':<10} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7}  degradations")
+    for mode in ("none", "deadline"):
+        dl.reset_degradations()
+        dl._context_cache = None
+        # Silence the pipeline logs
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies = asyncio.run(run(args.requests, args.sla, args.scale, args.stall_rate, mode == "deadline"))
+        print(f"{mode:<10} {percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f} "
+              f"{percentile(latencies, 99):>7.2f} {max(latencies):>7.2f}  {dl.get_degradation_report()}")
+
+
+if __name__ == "__main__":
+    main()
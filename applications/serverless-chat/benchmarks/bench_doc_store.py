@@ -0,0 +1,99 @@
+"""
+Measures the local doc store against keeping chunk texts in vector metadata:
+query payload size for k matches, cold open time, hydration latency and memory.
+
+The Confluence export is split in ~2000 character chunks and replicated --copies times.
+
+Usage (from applications/serverless-chat):
+    python -m benchmarks.bench_doc_store --copies 200
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from chat_app.doc_store import DocStore, DocStoreWriter  # noqa: E402
+
+CONFLUENCE_FILE = Path(__file__).resolve().parents[3] / "resources_rag" / "cf_bts_pages.json"
+
+
+def load_chunks(copies: int, chunk_chars: int = 2000):
+    pages = json.loads(CONFLUENCE_FILE.read_text(encoding="utf-8"))
+    for _ in range(copies):
+        for page in pages:
+            content = page["content"]
+            for start in range(0, len(content), chunk_chars):
+                metadata = {"source": "confluence", "title": page["title"],
+                            "page_id": page["page_id"], "source_url": page["source_url"]}
+                yield str(uuid.uuid4()), content[start:start + chunk_chars], metadata
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=10000)
+    args = parser.parse_args()
+
+    chunks = list(load_chunks(args.copies))
+    ids = [chunk_id for chunk_id, _, _ in chunks]
+    path = tempfile.mkdtemp()
+    with DocStoreWriter(path) as writer:
+        for chunk_id, text, metadata in chunks:
+            writer.add(chunk_id, text, metadata)
+    json_path = Path(path) / "texts.json"
+    json_path.write_text(json.dumps({chunk_id: [text, metadata] for chunk_id, text, metadata in chunks}))
+    print(f"{len(chunks)} chunks")
+
+    # Query payload: matches with text metadata vs ids and filter fields only
+    sample = random.sample(chunks, args.k)
+    full = [{"id": i, "score": 0.9, "metadata": {**m, "text": t}} for i, t, m in sample]
+    lean = [{"id": i, "score": 0.9, "metadata": {"source": m["source"], "page_id": m["page_id"]}}
+            for i, _, m in sample]
+    print(f"payload k={args.k}: with text {len(json.dumps(full))} bytes, ids only {len(json.dumps(lean))} bytes")
+    text_bytes = sum(len(t.encode("utf-8")) + len(json.dumps(m)) for _, t, m in chunks)
+    print(f"metadata stored in the index: with text {text_bytes / 2**20:.1f} MiB, "
+          f"ids only {sum(len(json.dumps({'source': m['source'], 'page_id': m['page_id']})) for _, _, m in chunks) / 2**20:.1f} MiB")
+    del chunks
+
+    # Cold open and python heap held by the store vs loading every text from a JSON file
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = DocStore(path)
+    open_ms = (time.perf_counter() - started) * 1000
+    store.get(ids[0])
+    store_heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    in_memory = json.loads(json_path.read_text())
+    dict_ms = (time.perf_counter() - started) * 1000
+    dict_heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del in_memory
+    print(f"open: doc store {open_ms:.2f}ms / {store_heap / 2**20:.2f} MiB heap, "
+          f"json file {dict_ms:.0f}ms / {dict_heap / 2**20:.1f} MiB heap")
+
+    # Hydration latency for k random ids
+    latencies = []
+    for _ in range(args.queries):
+        query_ids = random.sample(ids, args.k)
+        started = time.perf_counter()
+        for chunk_id in query_ids:
+            store.get(chunk_id)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    print(f"hydrate k={args.k}: mean {statistics.mean(latencies):.1f}us, "
+          f"p99 {sorted(latencies)[int(len(latencies) * 0.99)]:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Compares the LangChain Runnable chain (QA_PIPELINE=chain) with the direct HTTP pipeline
+(QA_PIPELINE=fast): cold start import time of the Lambda handler, first call latency,
+per call orchestration overhead and peak RSS.
+
+Providers are replaced by an in process mock HTTP transport with zero latency, so the
+per call numbers are the local overhead of each pipeline. The chain uses the real ChatOpenAI,
+OpenAIEmbeddings and PineconeVectorStore clients, only the Pinecone index object is faked
+because its SDK does not go through httpx; the fast pipeline still pays for the Pinecone
+HTTP request, so its overhead is slightly pessimistic. Each pipeline runs in a fresh process.
+
+Usage (from applications/serverless-chat):
+    python -m benchmarks.bench_fast_qa --calls 200
+"""
+import argparse
+import copy
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SERVERLESS_CHAT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SERVERLESS_CHAT_DIR))
+
+QUESTION = "Who is the person in charge of the company in Peru?"
+EMBEDDING = [0.01] * 1536
+MATCHES = [{"id": f"chunk-{i}", "score": 0.8 - i * 0.05,
+            "metadata": {"text": f"Chunk {i} about the Peru office. " * 20, "source_url": f"https://wiki/{i}"}}
+           for i in range(3)]
+
+
+def mock_response(request):
+    import httpx
+    path = request.url.path
+    if path.endswith("/chat/completions") and json.loads(request.content).get("stream"):
+        # The deadline pipeline streams the answer, usage comes in the last chunk
+        chunks = [{"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4.1-nano",
+                   "choices": [{"index": 0, "delta": {"role": "assistant", "content": word}, "finish_reason": None}]}
+                  for word in ("The country manager ", "runs the ", "Peru office.")]
+        chunks.append({"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4.1-nano",
+                       "choices": [], "usage": {"prompt_tokens": 900, "completion_tokens": 20, "total_tokens": 920}})
+        body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+    if path.endswith("/chat/completions"):
+        return httpx.Response(200, json={
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4.1-nano",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "The country manager runs the Peru office."}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 20, "total_tokens": 920},
+        })
+    if path.endswith("/embeddings"):
+        return httpx.Response(200, json={
+            "object": "list", "model": "text-embedding-3-small",
+            "data": [{"object": "embedding", "index": 0, "embedding": EMBEDDING}],
+            "usage": {"prompt_tokens": 10, "total_tokens": 10},
+        })
+    if path == "/query":
+        return httpx.Response(200, json={"matches": MATCHES, "namespace": ""})
+    return httpx.Response(404)
+
+
+class FakeIndex:
+    """Stands in for pinecone.Index in the chain, returns the same matches as the mocked REST API."""
+
+    class config:
+        host = "bench.local"
+        api_key = "bench"
+
+    def query(self, **kwargs):
+        # Copied, PineconeVectorStore pops the text out of the match metadata
+        return {"matches": copy.deepcopy(MATCHES)}
+
+
+def chain_runner():
+    import httpx
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from langchain_pinecone import PineconeVectorStore
+    from chat_app import qa_chat
+    from chat_app.deadline import Deadline
+    from chat_app.prompts import get_qa_prompt_template
+
+    http_client = httpx.Client(transport=httpx.MockTransport(mock_response))
+    llm = ChatOpenAI(model="gpt-4.1-nano", api_key="bench", temperature=0.7, http_client=http_client)
+    # Skips the tiktoken length check, which needs to download the encoding and costs microseconds for a question
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key="bench", http_client=http_client,
+                                  check_embedding_ctx_length=False)
+    retriever = PineconeVectorStore(index=FakeIndex(), embedding=embeddings).as_retriever(
+        search_type="similarity_score_threshold", search_kwargs={"k": 3, "score_threshold": 0.7})
+
+    def run(question):
+        # Built on every call and run with the Lambda deadline like run_qa_chatbot does in the handler
+        return qa_chat.run_qa_with_deadline(question, Deadline(179), qa_chat.get_rewriter_chain(llm, "openai"),
+                                            get_qa_prompt_template() | llm, lambda k, score_threshold: retriever)
+
+    return run
+
+
+def fast_runner():
+    import httpx
+    from chat_app import fast_qa
+
+    fast_qa._index_host = "bench.local"
+    client = httpx.AsyncClient(transport=httpx.MockTransport(mock_response))
+    loop = fast_qa.get_event_loop()
+
+    def run(question):
+        return loop.run_until_complete(fast_qa.answer_question(question, client))
+
+    return run
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(pipeline: str, calls: int):
+    """Measures one pipeline in this process and prints the results as JSON."""
+    os.environ["QA_PIPELINE"] = pipeline
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    started = time.perf_counter()
+    import chat_app.app  # noqa: F401, the handler module is what a cold start imports
+    import_ms = (time.perf_counter() - started) * 1000
+    import_rss = rss_mb()
+
+    # Silence the pipeline logs, they would dominate the overhead
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        run = chain_runner() if pipeline == "chain" else fast_runner()
+        started = time.perf_counter()
+        run(QUESTION)
+        first_ms = (time.perf_counter() - started) * 1000
+        latencies = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            run(QUESTION)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        sys.stdout = stdout
+    latencies.sort()
+    print(json.dumps({
+        "pipeline": pipeline,
+        "import_ms": import_ms,
+        "first_call_ms": first_ms,
+        "mean_ms": statistics.mean(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+        "import_rss_mb": import_rss,
+        "peak_rss_mb": rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per pipeline, the median is reported")
+    parser.add_argument("--child", choices=["chain", "fast"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.calls)
+        return
+
+    print(f"{'pipeline':<8} {'import ms':>9} {'1st call':>9} {'mean ms':>8} {'p95 ms':>8} "
+          f"{'RSS import':>10} {'RSS peak':>9}")
+    for pipeline in ("chain", "fast"):
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, "-m", "benchmarks.bench_fast_qa", "--child", pipeline,
+                                     "--calls", str(args.calls)],
+                                    cwd=SERVERLESS_CHAT_DIR, capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0] if key != "pipeline"}
+        print(f"{pipeline:<8} {median['import_ms']:>9.0f} {median['first_call_ms']:>9.1f} {median['mean_ms']:>8.2f} "
+              f"{median['p95_ms']:>8.2f} {median['import_rss_mb']:>8.0f}MB {median['peak_rss_mb']:>7.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
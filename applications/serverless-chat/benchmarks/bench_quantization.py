@@ -0,0 +1,88 @@
+"""
+Recall@k, memory per million vectors and query latency of the local vector index for
+reduced embedding dimensions combined with float32, int8 and binary quantization.
+Recall is measured against exact float32 search on the full 1536 dimension vectors.
+
+By default a synthetic clustered corpus is used, pass real embeddings (for example
+text-embedding-3-small vectors of the Confluence chunks and questions) as .npy files
+with --corpus and --queries-file for representative numbers. Synthetic vectors are not
+trained to keep their meaning when truncated like text-embedding-3 vectors are, so
+recall for reduced dimensions is pessimistic on the synthetic corpus.
+
+Usage (from applications/serverless-chat):
+    python -m benchmarks.bench_quantization --vectors 100000
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from chat_app.vector_index import VectorIndex, VectorIndexWriter, reduce_dimensions  # noqa: E402
+
+
+def synthetic_corpus(count: int, queries: int, dimensions: int = 1536, clusters: int = 200, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    corpus = centers[labels] + rng.normal(scale=1.5, size=(count, dimensions)).astype(np.float32)
+    picked = rng.integers(0, count, size=queries)
+    query_vectors = corpus[picked] + rng.normal(scale=1.0, size=(queries, dimensions)).astype(np.float32)
+    return reduce_dimensions(corpus, dimensions), reduce_dimensions(query_vectors, dimensions)
+
+
+def python_list_bytes(dimensions: int) -> int:
+    """Approximate size of one vector kept as a Python list of floats, like InMemoryVectorStore does."""
+    vector = [float(i) + 0.5 for i in range(dimensions)]
+    return sys.getsizeof(vector) + sum(sys.getsizeof(x) for x in vector)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--rescore-multiplier", type=int, default=4)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[1536, 512, 256])
+    parser.add_argument("--corpus", help=".npy file with corpus embeddings")
+    parser.add_argument("--queries-file", help=".npy file with query embeddings")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = reduce_dimensions(np.load(args.corpus), 100000)
+        queries = reduce_dimensions(np.load(args.queries_file), 100000)
+    else:
+        corpus, queries = synthetic_corpus(args.vectors, args.queries)
+    full_dimensions = corpus.shape[1]
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.k]
+    print(f"{len(corpus)} vectors, {len(queries)} queries, k={args.k}")
+    print(f"python list of floats: {python_list_bytes(full_dimensions) * 1e6 / 2**30:.1f} GiB per million vectors")
+    print(f"{'dims':>5} {'quant':<8} {'recall@k':>8} {'GiB/1M':>8} {'mean ms':>8} {'p95 ms':>8}")
+
+    for dimensions in args.dimensions:
+        path = tempfile.mkdtemp()
+        with VectorIndexWriter(path, dimensions) as writer:
+            for i, vector in enumerate(corpus):
+                writer.add(str(i), vector)
+        for quantization in ("float32", "int8", "binary"):
+            index = VectorIndex(path, quantization=quantization, rescore_multiplier=args.rescore_multiplier)
+            hits, latencies = 0, []
+            for query, expected in zip(queries, truth):
+                started = time.perf_counter()
+                matches = index.search(query, args.k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len({int(m["id"]) for m in matches} & set(expected.tolist()))
+            recall = hits / (len(queries) * args.k)
+            per_million = index.code_bytes() / len(index) * 1e6 / 2**30
+            p95 = sorted(latencies)[int(len(latencies) * 0.95)]
+            print(f"{dimensions:>5} {quantization:<8} {recall:>8.3f} {per_million:>8.3f} "
+                  f"{statistics.mean(latencies):>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
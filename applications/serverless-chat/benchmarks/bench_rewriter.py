@@ -0,0 +1,85 @@
+"""
+Compares question rewrite latency and quality between the remote model (gpt-4.1-nano)
+and the local LM Studio model on the Confluence question set.
+
+Quality is measured as token F1 against a reference rewrite, and as agreement
+between the local and the remote rewrite for the same question.
+
+Usage (from applications/serverless-chat, with LM Studio running):
+    python -m benchmarks.bench_rewriter
+"""
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from chat_app.qa_chat import get_llm, get_rewriter_chain  # noqa: E402
+from chat_app.rewriter import get_session, rewrite_question_locally  # noqa: E402
+
+QUESTIONS_FILE = Path(__file__).parent / "confluence_questions.json"
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def token_f1(prediction: str, reference: str) -> float:
+    """Token level F1 score between two strings."""
+    pred, ref = tokenize(prediction), tokenize(reference)
+    common = sum(min(pred.count(t), ref.count(t)) for t in set(pred))
+    if not pred or not ref or common == 0:
+        return 0.0
+    precision, recall = common / len(pred), common / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def summarize(name: str, latencies: list[float], scores: list[float]):
+    print(f"{name:<8} p50={percentile(latencies, 50):8.1f}ms p95={percentile(latencies, 95):8.1f}ms "
+          f"mean={statistics.mean(latencies):8.1f}ms  f1={statistics.mean(scores):.3f}")
+
+
+def main():
+    questions = json.loads(QUESTIONS_FILE.read_text())
+    remote_chain = get_rewriter_chain(get_llm(), backend="openai")
+    session = get_session()
+    # Warm up both paths so connection setup is not part of the measurement
+    remote_chain.invoke(questions[0]["question"])
+    rewrite_question_locally(questions[0]["question"], session=session)
+
+    remote_lat, local_lat, remote_f1, local_f1, agreement = [], [], [], [], []
+    for item in questions:
+        remote, ms = timed(lambda q: remote_chain.invoke(q).content, item["question"])
+        remote_lat.append(ms)
+        remote_f1.append(token_f1(remote, item["reference_rewrite"]))
+
+        local, ms = timed(lambda q: rewrite_question_locally(q, session=session), item["question"])
+        local_lat.append(ms)
+        local_f1.append(token_f1(local, item["reference_rewrite"]))
+        agreement.append(token_f1(local, remote))
+        print(f"- {item['question'][:60]}...\n    remote: {remote}\n    local:  {local}")
+
+    print(f"\n{len(questions)} questions")
+    summarize("remote", remote_lat, remote_f1)
+    summarize("local", local_lat, local_f1)
+    print(f"local/remote agreement f1={statistics.mean(agreement):.3f}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,165 @@
+"""
+History reads, consumed capacity and item size of the memory chat for DynamoDBChatMessageHistory
+(one plain History list per session) and CachedDynamoDBChatMessageHistory (compressed payload,
+version item and in-container session cache).
+
+DynamoDB is replaced by a local in memory stand-in that accounts read and write capacity
+units from item sizes like DynamoDB does. Multi-turn sessions are interleaved and each turn
+is routed to the container that served the previous turn of the session with probability
+--stickiness, otherwise to a random warm container with its own cache.
+
+Usage (from applications/serverless-chat):
+    python -m benchmarks.bench_session_history --sessions 200 --turns 12 --containers 4
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from collections import Counter
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from boto3.dynamodb.types import TypeDeserializer  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+from langchain_community.chat_message_histories import DynamoDBChatMessageHistory  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from chat_app import session_history as sh  # noqa: E402
+from chat_app.prompts import chatbot_prompt_text, q_trans_prompt_text  # noqa: E402
+
+QUESTIONS_FILE = Path(__file__).parent / "confluence_questions.json"
+
+
+def item_size(item: dict) -> int:
+    """Approximate DynamoDB item size: attribute names plus value sizes."""
+    size = 0
+    for name, value in item.items():
+        if isinstance(value, (bytes, bytearray)):
+            size += len(name) + len(value)
+        elif isinstance(value, str):
+            size += len(name) + len(value.encode("utf-8"))
+        elif isinstance(value, (int, float, Decimal)):
+            size += len(name) + len(str(value)) // 2 + 1
+        else:
+            size += len(name) + len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+    return size
+
+
+class LocalDynamoDBTable:
+    """In memory DynamoDB stand-in keyed by SessionId that meters consumed capacity."""
+    name = "ChatBotSessionTable"
+
+    def __init__(self):
+        self.items = {}
+        self.calls = Counter()
+        self.read_units = 0.0
+        self.write_units = 0.0
+        # transact_write_items is called on the low level client, like boto3 exposes it
+        self.meta = SimpleNamespace(client=self)
+
+    def get_item(self, Key, ConsistentRead=False):
+        self.calls["get_item"] += 1
+        item = self.items.get(Key["SessionId"])
+        units = math.ceil(max(item_size(item) if item else 1, 1) / 4096)
+        self.read_units += units if ConsistentRead else units / 2
+        return {"Item": dict(item)} if item else {}
+
+    def transact_write_items(self, TransactItems):
+        # Transactional writes consume two write units per KB of each item
+        self.calls["transact_write_items"] += 1
+        deserializer = TypeDeserializer()
+        puts = []
+        for operation in TransactItems:
+            put = operation["Put"]
+            item = {name: deserializer.deserialize(value) for name, value in put["Item"].items()}
+            item = {name: getattr(value, "value", value) for name, value in item.items()}
+            self.write_units += 2 * math.ceil(item_size(item) / 1024)
+            current = self.items.get(item["SessionId"])
+            expected = put.get("ExpressionAttributeValues", {}).get(":expected")
+            if expected is not None and current is not None and "Version" in current \
+                    and current["Version"] != deserializer.deserialize(expected):
+                raise ClientError({"Error": {"Code": "TransactionCanceledException"},
+                                   "CancellationReasons": [{"Code": "ConditionalCheckFailed"}]}, "TransactWriteItems")
+            puts.append(item)
+        for item in puts:
+            self.items[item["SessionId"]] = item
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues):
+        # Only the "set History = :h" update DynamoDBChatMessageHistory sends
+        self.calls["update_item"] += 1
+        item = {**self.items.get(Key["SessionId"], Key), "History": ExpressionAttributeValues[":h"]}
+        self.write_units += math.ceil(item_size(item) / 1024)
+        self.items[Key["SessionId"]] = item
+
+    def delete_item(self, Key):
+        self.items.pop(Key["SessionId"], None)
+
+
+def make_text(rng: random.Random, vocabulary: list[str], words: int) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def simulate(kind: str, args, vocabulary: list[str]):
+    rng = random.Random(args.seed)
+    table = LocalDynamoDBTable()
+    caches = [sh.SessionCache(args.cache_mb * 2**20) for _ in range(args.containers)]
+    sh.reset_session_cache_stats()
+    schedule = [session for session in range(args.sessions) for _ in range(args.turns)]
+    rng.shuffle(schedule)
+    last_container = {}
+    for session in schedule:
+        container = last_container.get(session)
+        if container is None or rng.random() > args.stickiness:
+            container = rng.randrange(args.containers)
+        last_container[session] = container
+        session_id = f"session-{session}"
+        if kind == "baseline":
+            history = DynamoDBChatMessageHistory(table_name="ChatBotSessionTable", session_id=session_id)
+            history.table = table
+        else:
+            history = sh.CachedDynamoDBChatMessageHistory(session_id=session_id, table=table, cache=caches[container])
+        # RunnableWithMessageHistory reads the history for the prompt, then appends the turn
+        history.messages
+        history.add_messages([HumanMessage(content=make_text(rng, vocabulary, rng.randint(10, 40))),
+                              AIMessage(content=make_text(rng, vocabulary, rng.randint(80, 250)))])
+    history_items = [item for key, item in table.items.items() if not key.endswith(sh.VERSION_KEY_SUFFIX)]
+    return {
+        "turns": len(schedule),
+        "full_reads": table.calls["get_item"] if kind == "baseline" else sh.get_session_cache_stats()["full_reads"],
+        "get_item": table.calls["get_item"],
+        "read_units": table.read_units,
+        "write_units": table.write_units,
+        "item_kb": sum(item_size(item) for item in history_items) / len(history_items) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--containers", type=int, default=4)
+    parser.add_argument("--stickiness", type=float, default=0.9)
+    parser.add_argument("--cache-mb", type=float, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    questions = [item["question"] for item in json.loads(QUESTIONS_FILE.read_text(encoding="utf-8"))]
+    vocabulary = " ".join(questions + [chatbot_prompt_text, q_trans_prompt_text]).split()
+    print(f"{args.sessions} sessions x {args.turns} turns, {args.containers} containers, "
+          f"stickiness {args.stickiness}, codecs {sh.encode_messages([])[1]}")
+    print(f"{'history':<9} {'full reads/turn':>15} {'gets/turn':>9} {'RCU/turn':>9} {'WCU/turn':>9} {'item KB':>8}")
+    for kind in ("baseline", "cached"):
+        result = simulate(kind, args, vocabulary)
+        turns = result["turns"]
+        print(f"{kind:<9} {result['full_reads'] / turns:>15.2f} {result['get_item'] / turns:>9.2f} "
+              f"{result['read_units'] / turns:>9.2f} {result['write_units'] / turns:>9.2f} {result['item_kb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
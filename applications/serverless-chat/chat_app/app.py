@@ -1,12 +1,19 @@
 import json
-from chat_app.qa_chat import run_qa_chatbot
-from chat_app.memory_chat import run_memory_chatbot
 import boto3
 from botocore.exceptions import ClientError
 import os
 from chat_app.constants import configure_remote_env_vars
+from chat_app.deadline import Deadline, get_degradation_report
 ssm = boto3.client('ssm')
 os.environ["LANGSMITH_PROJECT"] = "serverless-chat"
+# "chain" runs the LangChain Runnable graph, "fast" the direct HTTP pipeline that does not import LangChain
+QA_PIPELINE = os.getenv("QA_PIPELINE", "chain")
+if QA_PIPELINE == "fast":
+    from chat_app.fast_qa import run_fast_qa_chatbot as run_qa_chatbot
+elif QA_PIPELINE == "chain":
+    from chat_app.qa_chat import run_qa_chatbot
+else:
+    raise ValueError(f"Unsupported QA pipeline: {QA_PIPELINE}")
 
 
 def lambda_handler(event, context):
@@ -31,11 +38,25 @@ def lambda_handler(event, context):
             }),
         }
 
+    # Optional client SLA in milliseconds, the answer is returned, possibly degraded, before it runs out
+    sla_ms = body.get("sla_ms")
+    if sla_ms is not None and (not isinstance(sla_ms, (int, float)) or isinstance(sla_ms, bool) or sla_ms <= 0):
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "message": "Bad Request: 'sla_ms' must be a positive number",
+            }),
+        }
+    deadline = Deadline.from_lambda_context(context, sla_ms)
+
     configure_env_vars()
     print("Running chatbot with the provided question", chat_type, session_id)
     if(chat_type == "qa"):
-        response = run_qa_chatbot(question)
+        response = run_qa_chatbot(question, deadline=deadline)
+        print(f"Degradations so far: {get_degradation_report()}")
     elif(chat_type == "memory"):
+        # Imported on first use so the fast QA pipeline does not pay for LangChain on cold start
+        from chat_app.memory_chat import run_memory_chatbot
         response = run_memory_chatbot(question, session_id)
     else:
         response = "Unsupported chat type. Please use 'qa' for question-answering."
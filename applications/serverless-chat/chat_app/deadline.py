@@ -0,0 +1,251 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Client SLA used when the request does not send sla_ms, 0 only uses the Lambda deadline
+DEFAULT_SLA_MS = float(os.getenv("QA_SLA_MS", "0"))
+# Kept back from the Lambda deadline to log, serialize and return the response
+RESPONSE_RESERVE_MS = float(os.getenv("DEADLINE_RESERVE_MS", "1000"))
+# Upper limits per stage in seconds once the deadline is tight, a stage never uses the time
+# reserved for the next stages
+REWRITE_BUDGET_S = float(os.getenv("REWRITE_BUDGET_S", "2"))
+RETRIEVE_BUDGET_S = float(os.getenv("RETRIEVE_BUDGET_S", "3"))
+# Time always kept for the answer, below it the earlier stages are skipped or cut short
+ANSWER_MIN_S = float(os.getenv("ANSWER_MIN_S", "3"))
+# With more time left than this the stages are not capped, a slow cold start still gets an answer
+TIGHT_DEADLINE_S = float(os.getenv("TIGHT_DEADLINE_S", str(REWRITE_BUDGET_S + RETRIEVE_BUDGET_S + 2 * ANSWER_MIN_S)))
+# A stage with less time than this is skipped instead of started
+MIN_STAGE_S = 0.2
+# Read timeout of the provider calls, also bounds how long a call cut short by its budget keeps its thread
+PROVIDER_TIMEOUT_S = float(os.getenv("QA_HTTP_TIMEOUT", "60"))
+# k used when the time left before retrieval is tight, fewer chunks make a shorter answer prompt
+REDUCED_K = 1
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "256"))
+
+TRUNCATED_SUFFIX = " [...]"
+TIMEOUT_MESSAGE = "I couldn't answer your question in time, please try again."
+
+# Degradations counted for the lifetime of the container
+_degradations = Counter()
+_context_cache = None
+
+
+class StageTimeout(TimeoutError):
+    """Raised when a stage does not finish within its budget or has no time left to start."""
+
+
+class Deadline:
+    """
+    Absolute deadline of a request on the monotonic clock, shared by every stage.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + max(seconds, 0)
+
+    @classmethod
+    def from_lambda_context(cls, context, sla_ms: float = None):
+        """
+        Returns the earliest of the Lambda deadline (minus the response reserve) and the
+        client SLA, or None when neither is known.
+        """
+        limits_ms = []
+        if hasattr(context, "get_remaining_time_in_millis"):
+            limits_ms.append(context.get_remaining_time_in_millis() - RESPONSE_RESERVE_MS)
+        if sla_ms or DEFAULT_SLA_MS:
+            limits_ms.append(float(sla_ms or DEFAULT_SLA_MS))
+        if not limits_ms:
+            return None
+        return cls(min(limits_ms) / 1000)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def tight(self) -> bool:
+        return self.remaining() < TIGHT_DEADLINE_S
+
+    def budget(self, limit: float, reserve: float = 0.0) -> float:
+        """
+        Returns the seconds a stage may use: the time left minus the reserve of the next
+        stages, and at most its limit when the deadline is tight.
+        """
+        available = self.remaining() - reserve
+        if self.tight():
+            available = min(limit, available)
+        return max(available, 0.0)
+
+
+def rewrite_budget(deadline: Deadline) -> float:
+    if deadline.tight():
+        return deadline.budget(REWRITE_BUDGET_S, reserve=MIN_STAGE_S + ANSWER_MIN_S)
+    # A stalled rewrite still leaves the retrieval its full limit
+    return deadline.budget(REWRITE_BUDGET_S, reserve=RETRIEVE_BUDGET_S + ANSWER_MIN_S)
+
+
+def retrieve_budget(deadline: Deadline) -> float:
+    return deadline.budget(RETRIEVE_BUDGET_S, reserve=ANSWER_MIN_S)
+
+
+def choose_k(deadline: Deadline, k: int) -> int:
+    """
+    Lowers k when the full retrieve budget and a comfortable answer no longer fit.
+    """
+    if k > REDUCED_K and deadline.remaining() < RETRIEVE_BUDGET_S + 2 * ANSWER_MIN_S:
+        record_degradation("k_lowered")
+        return REDUCED_K
+    return k
+
+
+def start_stage_thread(fn, *args) -> Future:
+    """
+    Runs fn(*args) in a new daemon thread and returns the future of its result.
+    A call cut short by its budget keeps running in its own thread until the provider
+    timeout ends it, so stalled calls never hold back the stages of the next requests
+    the way a saturated thread pool would.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="stage", daemon=True).start()
+    return future
+
+
+def call_with_timeout(fn, timeout: float, *args):
+    """
+    Runs fn(*args) in a stage thread and returns its result.
+    Raises StageTimeout when timeout is too short to start or fn does not finish in time.
+    """
+    if timeout < MIN_STAGE_S:
+        raise StageTimeout(f"{timeout:.2f}s left, stage skipped")
+    future = start_stage_thread(fn, *args)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise StageTimeout(f"Stage did not finish in {timeout:.2f}s")
+
+
+async def within(awaitable, timeout: float, minimum: float = None):
+    """
+    Async counterpart of call_with_timeout: awaits a stage within its budget, raises
+    StageTimeout when the budget is too short to start it or the stage does not finish in time.
+    """
+    if timeout <= (MIN_STAGE_S if minimum is None else minimum):
+        awaitable.close()
+        raise StageTimeout(f"{timeout:.2f}s left, stage skipped")
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise StageTimeout(f"Stage did not finish in {timeout:.2f}s")
+
+
+class DeadlineStream:
+    """
+    Iterates a blocking stream in a stage thread and stops at the deadline, so a
+    stalled provider cannot hold the request past it. `truncated` tells whether the
+    stream was cut short.
+    """
+    _DONE = object()
+
+    def __init__(self, make_stream, deadline: Deadline):
+        self.truncated = False
+        self._deadline = deadline
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        start_stage_thread(self._produce, make_stream)
+
+    def _produce(self, make_stream):
+        try:
+            for item in make_stream():
+                if self._stopped.is_set():
+                    break  # closes the generator, and the provider connection with it
+                self._queue.put((item, None))
+        except Exception as e:
+            self._queue.put((None, e))
+            return
+        self._queue.put((self._DONE, None))
+
+    def __iter__(self):
+        try:
+            while True:
+                if self._deadline.expired():
+                    self.truncated = True
+                    return
+                try:
+                    item, error = self._queue.get(timeout=max(self._deadline.remaining(), 0))
+                except queue.Empty:
+                    self.truncated = True
+                    return
+                if error is not None:
+                    raise error
+                if item is self._DONE:
+                    return
+                yield item
+        finally:
+            self._stopped.set()
+
+
+class ContextCache:
+    """
+    LRU of the last retrieved context per question, served when retrieval runs out of time.
+    """
+
+    def __init__(self, max_entries: int = CONTEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def get(self, question: str):
+        with self._lock:
+            context = self._entries.get(self.key(question))
+            if context is not None:
+                self._entries.move_to_end(self.key(question))
+            return context
+
+    def put(self, question: str, context: str):
+        with self._lock:
+            self._entries[self.key(question)] = context
+            self._entries.move_to_end(self.key(question))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def get_context_cache() -> ContextCache:
+    global _context_cache
+    if _context_cache is None:
+        _context_cache = ContextCache()
+    return _context_cache
+
+
+def record_degradation(kind: str):
+    """
+    Counts a degradation: rewrite_skipped, k_lowered, cached_context, context_missing,
+    answer_truncated or answer_skipped.
+    """
+    _degradations[kind] += 1
+    print(f"Degradation [{kind}]: total={_degradations[kind]}")
+
+
+def get_degradation_report() -> dict:
+    return dict(_degradations)
+
+
+def reset_degradations():
+    _degradations.clear()
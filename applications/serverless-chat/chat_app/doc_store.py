@@ -0,0 +1,151 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+TEXTS_FILE = "texts.bin"
+INDEX_FILE = "index.bin"
+METADATA_FILE = "metadata.json"
+
+# Index record: blake2b-128 digest of the chunk id, text offset, text length, metadata row.
+# Records are sorted by digest so lookups are a binary search over the mapped file.
+RECORD = struct.Struct("<16sQII")
+
+
+def id_digest(chunk_id: str) -> bytes:
+    return hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=16).digest()
+
+
+class DocStoreWriter:
+    """
+    Writes chunk texts to a single blob, an offset/length index keyed by chunk id
+    and the chunk metadata as dictionary encoded columns.
+    Texts are streamed to disk, only the 32 byte index records and the metadata
+    columns are kept in memory until close().
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._texts = open(os.path.join(path, TEXTS_FILE), "wb")
+        self._offset = 0
+        self._records = []
+        self._columns = {}
+        self._rows = 0
+
+    def add(self, chunk_id: str, text: str, metadata: dict = None):
+        data = text.encode("utf-8")
+        self._texts.write(data)
+        self._records.append((id_digest(chunk_id), self._offset, len(data), self._rows))
+        self._offset += len(data)
+        for key, value in (metadata or {}).items():
+            column = self._columns.setdefault(key, {"values": [], "lookup": {}, "codes": [None] * self._rows})
+            code = column["lookup"].get(value)
+            if code is None:
+                code = column["lookup"][value] = len(column["values"])
+                column["values"].append(value)
+            column["codes"].append(code)
+        self._rows += 1
+        for column in self._columns.values():
+            if len(column["codes"]) < self._rows:
+                column["codes"].append(None)
+
+    def close(self):
+        self._texts.close()
+        self._records.sort()
+        with open(os.path.join(self.path, INDEX_FILE), "wb") as file:
+            for record in self._records:
+                file.write(RECORD.pack(*record))
+        columns = {key: {"values": column["values"], "codes": column["codes"]}
+                   for key, column in self._columns.items()}
+        with open(os.path.join(self.path, METADATA_FILE), "w", encoding="utf-8") as file:
+            json.dump({"rows": self._rows, "columns": columns}, file, ensure_ascii=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DocStore:
+    """
+    Read only view over a store written by DocStoreWriter.
+    Texts and index are memory mapped, so opening the store does not read them and
+    the pages are shared by the OS page cache. Metadata columns are loaded on first use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._texts = _map_file(os.path.join(path, TEXTS_FILE))
+        self._index = _map_file(os.path.join(path, INDEX_FILE))
+        self._count = len(self._index) // RECORD.size
+        self._columns = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return self._find(chunk_id) is not None
+
+    def get_text(self, chunk_id: str):
+        """
+        Returns the chunk text, or None if the id is not in the store.
+        """
+        record = self._find(chunk_id)
+        if record is None:
+            return None
+        _, offset, length, _ = record
+        return str(memoryview(self._texts)[offset:offset + length], "utf-8")
+
+    def get_metadata(self, chunk_id: str):
+        """
+        Returns the chunk metadata, or None if the id is not in the store.
+        """
+        record = self._find(chunk_id)
+        if record is None:
+            return None
+        return self._row_metadata(record[3])
+
+    def get(self, chunk_id: str):
+        """
+        Returns (text, metadata) for the chunk id, or None if the id is not in the store.
+        """
+        record = self._find(chunk_id)
+        if record is None:
+            return None
+        _, offset, length, row = record
+        return str(memoryview(self._texts)[offset:offset + length], "utf-8"), self._row_metadata(row)
+
+    def _row_metadata(self, row: int) -> dict:
+        if self._columns is None:
+            with open(os.path.join(self.path, METADATA_FILE), encoding="utf-8") as file:
+                self._columns = json.load(file)["columns"]
+        metadata = {}
+        for key, column in self._columns.items():
+            code = column["codes"][row]
+            if code is not None:
+                metadata[key] = column["values"][code]
+        return metadata
+
+    def _find(self, chunk_id: str):
+        digest = id_digest(chunk_id)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            current = self._index[middle * RECORD.size:middle * RECORD.size + 16]
+            if current < digest:
+                low = middle + 1
+            elif current > digest:
+                high = middle
+            else:
+                return RECORD.unpack_from(self._index, middle * RECORD.size)
+        return None
+
+
+def _map_file(path: str):
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
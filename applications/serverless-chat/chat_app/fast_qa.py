@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+from chat_app.deadline import (PROVIDER_TIMEOUT_S, TIMEOUT_MESSAGE, TRUNCATED_SUFFIX, Deadline, StageTimeout, choose_k,
+                               get_context_cache, record_degradation, retrieve_budget, rewrite_budget, within)
+from chat_app.prompts import chatbot_prompt_text, q_trans_prompt_text
+from chat_app.retrieval import (DOC_STORE_PATH, EMBEDDING_DIMENSIONS, LOCAL_INDEX_PATH, STOP_MESSAGE, Chunk,
+                                format_docs, get_doc_store, get_local_index, hydrate_chunks, is_context_valid,
+                                relevance_score)
+from chat_app.usage import parse_openai_usage, record_token_usage
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+CHAT_MODEL = "gpt-4.1-nano"
+EMBEDDING_MODEL = "text-embedding-3-small"
+PINECONE_INDEX = "rag-class"
+PINECONE_CONTROL_URL = "https://api.pinecone.io"
+PINECONE_API_VERSION = "2025-04"
+# Data plane host of the index, when set the describe index call on cold start is skipped
+PINECONE_INDEX_HOST = os.getenv("PINECONE_INDEX_HOST")
+HTTP_TIMEOUT = httpx.Timeout(PROVIDER_TIMEOUT_S, connect=2.0)
+
+# The event loop and the HTTP client live as long as the container, so warm invocations
+# reuse the keep-alive connections to OpenAI and Pinecone
+_loop = None
+_client = None
+_index_host = PINECONE_INDEX_HOST
+
+
+def run_fast_qa_chatbot(question: str, deadline: Deadline = None):
+    """Same rewrite -> retrieve -> validate -> answer pipeline as run_qa_chatbot, as a plain
+    async function calling the OpenAI and Pinecone REST APIs over a pooled HTTP client,
+    without the Runnable graph and its callback machinery.
+    Returns the answer generated by the LLM."""
+    if not question:
+        raise ValueError("Question cannot be empty.")
+    client = get_http_client()
+    if deadline is not None:
+        return get_event_loop().run_until_complete(answer_question_with_deadline(question, client, deadline))
+    return get_event_loop().run_until_complete(answer_question(question, client))
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop of the container. asyncio.run would close the loop, and the
+    pooled connections bound to it, after every invocation.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the HTTP client shared by every request of the container.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=60),
+        )
+    return _client
+
+
+async def answer_question(question: str, client: httpx.AsyncClient, k: int = 3, score_threshold: float = 0.7) -> str:
+    """
+    Rewrites the question, retrieves the context for the rewritten question and answers
+    the original question, or returns the stop message when no context was found.
+    """
+    rewrite_messages = [{"role": "user", "content": q_trans_prompt_text.format(question=question)}]
+    rag_question = await chat_completion(client, rewrite_messages, stage="rewrite")
+    print("Rewritten question:", rag_question)
+    context = format_docs(await retrieve(client, rag_question, k, score_threshold))
+    if not is_context_valid(context):
+        return STOP_MESSAGE
+    messages = [
+        {"role": "system", "content": chatbot_prompt_text.format(context=context)},
+        {"role": "user", "content": question},
+    ]
+    return await chat_completion(client, messages, stage="answer")
+
+
+async def answer_question_with_deadline(question: str, client: httpx.AsyncClient, deadline: Deadline, k: int = 3,
+                                        score_threshold: float = 0.7) -> str:
+    """
+    Same stages as answer_question, each within its share of the deadline. Like
+    run_qa_with_deadline it skips the rewrite, lowers k, reuses the last context of the
+    question and cuts the streamed answer at the deadline instead of failing.
+    """
+    rag_question = question
+    rewrite_messages = [{"role": "user", "content": q_trans_prompt_text.format(question=question)}]
+    try:
+        rag_question = await within(chat_completion(client, rewrite_messages, stage="rewrite"),
+                                    rewrite_budget(deadline)) or question
+    except StageTimeout as e:
+        print(f"Rewrite skipped: {e}")
+        record_degradation("rewrite_skipped")
+
+    k = choose_k(deadline, k)
+    try:
+        chunks = await within(retrieve(client, rag_question, k, score_threshold), retrieve_budget(deadline))
+        context = format_docs(chunks)
+        if context:
+            get_context_cache().put(question, context)
+    except StageTimeout as e:
+        print(f"Retrieval cut short: {e}")
+        context = get_context_cache().get(question)
+        record_degradation("cached_context" if context else "context_missing")
+    if not is_context_valid(context):
+        return STOP_MESSAGE
+
+    messages = [
+        {"role": "system", "content": chatbot_prompt_text.format(context=context)},
+        {"role": "user", "content": question},
+    ]
+    parts = []
+    try:
+        await within(stream_chat_completion(client, messages, parts, stage="answer"), deadline.remaining(), minimum=0)
+    except StageTimeout:
+        if not "".join(parts):
+            record_degradation("answer_skipped")
+            return TIMEOUT_MESSAGE
+        record_degradation("answer_truncated")
+        return "".join(parts) + TRUNCATED_SUFFIX
+    return "".join(parts)
+
+
+async def chat_completion(client: httpx.AsyncClient, messages: list, stage: str, model: str = CHAT_MODEL,
+                          temperature: float = 0.7) -> str:
+    """
+    Calls the chat completions endpoint and records the token usage of the stage.
+    """
+    response = await client.post(f"{OPENAI_BASE_URL}/chat/completions", headers=openai_headers(),
+                                 json={"model": model, "messages": messages, "temperature": temperature})
+    response.raise_for_status()
+    body = response.json()
+    record_token_usage(stage, parse_openai_usage(body.get("usage")))
+    return body["choices"][0]["message"]["content"] or ""
+
+
+async def stream_chat_completion(client: httpx.AsyncClient, messages: list, parts: list, stage: str,
+                                 model: str = CHAT_MODEL, temperature: float = 0.7):
+    """
+    Streams a chat completion, appending the content deltas to parts as they arrive so the
+    caller keeps the partial answer when the stream is cancelled. Records the token usage
+    sent in the last chunk.
+    """
+    payload = {"model": model, "messages": messages, "temperature": temperature, "stream": True,
+               "stream_options": {"include_usage": True}}
+    async with client.stream("POST", f"{OPENAI_BASE_URL}/chat/completions", headers=openai_headers(),
+                             json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("usage"):
+                record_token_usage(stage, parse_openai_usage(chunk["usage"]))
+            for choice in chunk.get("choices") or []:
+                parts.append((choice.get("delta") or {}).get("content") or "")
+
+
+async def embed_query(client: httpx.AsyncClient, text: str) -> list[float]:
+    payload = {"model": EMBEDDING_MODEL, "input": text}
+    if EMBEDDING_DIMENSIONS:
+        payload["dimensions"] = EMBEDDING_DIMENSIONS
+    response = await client.post(f"{OPENAI_BASE_URL}/embeddings", headers=openai_headers(), json=payload)
+    response.raise_for_status()
+    return response.json()["data"][0]["embedding"]
+
+
+async def retrieve(client: httpx.AsyncClient, question: str, k: int = 3, score_threshold: float = 0.7) -> list[Chunk]:
+    """
+    Returns the chunks above the threshold, from the same source get_retriever uses:
+    the local index, Pinecone ids hydrated from the doc store, or Pinecone metadata.
+    """
+    vector = await embed_query(client, question)
+    if LOCAL_INDEX_PATH:
+        return hydrate_chunks(get_local_index().search(vector, k), get_doc_store(), score_threshold)
+    matches = await query_index(client, vector, k, include_metadata=not DOC_STORE_PATH)
+    if DOC_STORE_PATH:
+        return hydrate_chunks(matches, get_doc_store(), score_threshold)
+    chunks = []
+    for match in matches:
+        if relevance_score(match["score"]) < score_threshold:
+            continue
+        metadata = dict(match.get("metadata") or {})
+        # PineconeVectorStore keeps the chunk text in the "text" metadata field
+        chunks.append(Chunk(match["id"], metadata.pop("text", ""), metadata))
+    return chunks
+
+
+async def query_index(client: httpx.AsyncClient, vector: list[float], k: int, include_metadata: bool = True) -> list[dict]:
+    host = await get_index_host(client)
+    response = await client.post(f"https://{host}/query", headers=pinecone_headers(),
+                                 json={"vector": vector, "topK": k, "includeMetadata": include_metadata})
+    response.raise_for_status()
+    return response.json().get("matches", [])
+
+
+async def get_index_host(client: httpx.AsyncClient) -> str:
+    """
+    Returns the data plane host of the index, resolved once per container.
+    """
+    global _index_host
+    if _index_host is None:
+        response = await client.get(f"{PINECONE_CONTROL_URL}/indexes/{PINECONE_INDEX}", headers=pinecone_headers())
+        response.raise_for_status()
+        _index_host = response.json()["host"]
+    return _index_host
+
+
+def openai_headers() -> dict:
+    # Read on every call, the API keys are only set after configure_env_vars runs in the handler
+    return {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+
+
+def pinecone_headers() -> dict:
+    return {"Api-Key": os.getenv("PINECONE_API_KEY", ""), "X-Pinecone-API-Version": PINECONE_API_VERSION}
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    question = "Who is the person in charge of the company in Peru?"
+    print("Response:", run_fast_qa_chatbot(question))
@@ -1,29 +1,23 @@
+import os
+
 from langchain_community.chat_message_histories import DynamoDBChatMessageHistory
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import RunnableWithMessageHistory
-from langchain.prompts import (
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate,
-    MessagesPlaceholder,
-    ChatPromptTemplate
-)
 
 from langchain_openai import ChatOpenAI
+from chat_app.prompts import get_memory_prompt_template
+from chat_app.usage import record_usage
+from chat_app.session_history import CachedDynamoDBChatMessageHistory, get_session_cache_stats
+
+# "true" keeps recent sessions in the container and stores compressed histories,
+# "false" reads and writes the plain History list of DynamoDBChatMessageHistory
+SESSION_HISTORY_CACHE = os.getenv("SESSION_HISTORY_CACHE", "true") == "true"
 
 
 def run_memory_chatbot(message, session_id):
     print(f"Running memory chatbot with message: {message} and session_id: {session_id}")
     llm = get_llm()
 
-    system_prompt = "You are a helpful assistant called Zeta."
-
-    prompt_template = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(system_prompt),
-        MessagesPlaceholder(variable_name="history"),
-        HumanMessagePromptTemplate.from_template("{query}"),
-    ])
-
-    pipeline = prompt_template | llm
+    pipeline = get_memory_prompt_template() | llm
 
     chat_history = get_chat_history(session_id)
 
@@ -34,6 +28,9 @@ def run_memory_chatbot(message, session_id):
         config={"configurable": {"session_id": session_id}}
     )
     print(f"Memory chatbot response: {result}")
+    record_usage("memory", result)
+    if SESSION_HISTORY_CACHE:
+        print(f"Session history cache: {get_session_cache_stats()}")
     return result.content
 
 
@@ -47,6 +44,8 @@ def get_llm():
 
 def get_chat_history(session_id):
     dynamo_table_name = "ChatBotSessionTable"
+    if SESSION_HISTORY_CACHE:
+        return CachedDynamoDBChatMessageHistory(table_name=dynamo_table_name, session_id=session_id)
     chat_history = DynamoDBChatMessageHistory(table_name=dynamo_table_name, session_id=session_id)
     return chat_history
 
@@ -5,17 +5,29 @@ from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone
 from langchain_core.runnables import RunnablePassthrough, RunnableBranch, RunnableLambda
 from langchain_core.messages import AIMessage
+from langchain_core.documents import Document
 from langchain_core.runnables import RunnableLambda, RunnableMap
 from langchain_core.prompts import ChatPromptTemplate
-from chat_app.prompts import chatbot_prompt_text, q_trans_prompt_text
+from chat_app.prompts import get_qa_prompt_template, q_trans_prompt_text
+from chat_app.usage import record_usage
+from chat_app.deadline import (PROVIDER_TIMEOUT_S, TIMEOUT_MESSAGE, TRUNCATED_SUFFIX, Deadline, DeadlineStream,
+                               StageTimeout, call_with_timeout, choose_k, get_context_cache, record_degradation,
+                               retrieve_budget, rewrite_budget)
+from chat_app.retrieval import (DOC_STORE_PATH, EMBEDDING_DIMENSIONS, LOCAL_INDEX_PATH, STOP_MESSAGE, format_docs,
+                                 get_doc_store, get_local_index, hydrate_chunks, is_context_valid)
 from langchain_core.tracers.langchain import wait_for_all_tracers
 
 pinecone_api_key = os.environ.get("PINECONE_API_KEY")
+# "openai" uses the remote model, "lm_studio" the local model with the remote one as fallback
+REWRITER_BACKEND = os.getenv("REWRITER_BACKEND", "openai")
 
 
-def run_qa_chatbot(question: str):
+def run_qa_chatbot(question: str, deadline: Deadline = None):
     """Runs the chatbot with the given question, using a rewriter to transform the question,
     a retriever to find relevant documents, and an LLM to generate the answer.
+    With a deadline every stage runs within its share of the remaining time through
+    run_qa_with_deadline. In Lambda there always is one, so the full chain only runs
+    locally, when no deadline is known.
     Returns the answer generated by the LLM."""
     if not question:
         raise ValueError("Question cannot be empty.")
@@ -23,17 +35,12 @@ def run_qa_chatbot(question: str):
     try:
         openai_llm = get_llm()
         rewrite_chain = get_rewriter_chain(openai_llm)
+        if deadline is not None:
+            return run_qa_with_deadline(question, deadline, rewrite_chain, get_qa_prompt_template() | openai_llm)
         retriever = get_retriever(k=3, score_threshold=0.7)
         retriever_chain = get_retriever_chain(retriever)
 
-        prompt_template = ChatPromptTemplate.from_messages(
-            [
-                ("system", chatbot_prompt_text),
-                ("human", "{question}"),
-            ]
-        )
-
-        call_llm = prompt_template | openai_llm
+        call_llm = get_qa_prompt_template() | openai_llm
         stop_step = RunnableLambda(stop_step_fn)
         full_chain = get_full_chain(rewrite_chain, retriever_chain, call_llm, stop_step)
 
@@ -41,12 +48,63 @@ def run_qa_chatbot(question: str):
 
         for key, value in res.items():
             print(f"{key}: {value}\n\n")
+        record_usage("rewrite", res.get("rag_question"))
+        record_usage("answer", res["result"])
         return res["result"].content
     finally:
         # Ensure all tracers are waited for before exiting
         wait_for_all_tracers()
 
 
+def run_qa_with_deadline(question: str, deadline: Deadline, rewrite_chain, call_llm, make_retriever=None,
+                         k: int = 3, score_threshold: float = 0.7) -> str:
+    """
+    Runs the stages of the full chain one by one, degrading instead of failing when one
+    runs over its budget: the rewrite is skipped, k is lowered, the last context retrieved
+    for the question is reused and the streamed answer is cut at the deadline.
+    make_retriever(k, score_threshold) builds the retriever, get_retriever by default.
+    """
+    make_retriever = make_retriever or get_retriever
+    rag_question = question
+    try:
+        rewritten = call_with_timeout(rewrite_chain.invoke, rewrite_budget(deadline), question)
+        record_usage("rewrite", rewritten)
+        rag_question = rewritten.content or question
+    except StageTimeout as e:
+        print(f"Rewrite skipped: {e}")
+        record_degradation("rewrite_skipped")
+
+    # Built before the timed call, only the search itself counts against the retrieve budget
+    retriever = make_retriever(choose_k(deadline, k), score_threshold)
+    try:
+        context = call_with_timeout(lambda: format_docs(retriever.invoke(rag_question)), retrieve_budget(deadline))
+        if context:
+            get_context_cache().put(question, context)
+    except StageTimeout as e:
+        print(f"Retrieval cut short: {e}")
+        context = get_context_cache().get(question)
+        record_degradation("cached_context" if context else "context_missing")
+    if not is_context_valid(context):
+        return STOP_MESSAGE
+    # Like the fast path, an expired deadline never sends the answer request
+    if deadline.expired():
+        record_degradation("answer_skipped")
+        return TIMEOUT_MESSAGE
+
+    stream = DeadlineStream(lambda: call_llm.stream({"context": context, "question": question}), deadline)
+    message = None
+    for chunk in stream:
+        message = chunk if message is None else message + chunk
+    if message is None or not message.content:
+        record_degradation("answer_skipped")
+        return TIMEOUT_MESSAGE
+    record_usage("answer", message)
+    if stream.truncated:
+        record_degradation("answer_truncated")
+        return message.content + TRUNCATED_SUFFIX
+    return message.content
+
+
 def get_full_chain(rewrite_chain, retriever_chain, call_llm, stop_step):
     """
     Returns a full chain that combines the rewriter, retriever,
@@ -85,6 +143,10 @@ def get_llm():
         model="gpt-4.1-nano",
         api_key=os.getenv("OPENAI_API_KEY"),
         temperature=0.7,
+        # Token usage is also reported when the answer is streamed
+        stream_usage=True,
+        # Calls cut short by a stage budget end here instead of holding their thread indefinitely
+        timeout=PROVIDER_TIMEOUT_S,
         verbose=True
     )
 
@@ -93,8 +155,13 @@ def get_retriever(k: int = 3, score_threshold: float = 0.7):
     """
     Returns a retriever that uses Pinecone to retrieve relevant documents based on the question.
     """
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=EMBEDDING_DIMENSIONS,
+                                  timeout=PROVIDER_TIMEOUT_S)
+    if LOCAL_INDEX_PATH:
+        return get_local_index_retriever(get_local_index(), embeddings, get_doc_store(), k, score_threshold)
     pc = Pinecone(api_key=pinecone_api_key)
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    if DOC_STORE_PATH:
+        return get_doc_store_retriever(pc.Index("rag-class"), embeddings, get_doc_store(), k, score_threshold)
     vector_store = PineconeVectorStore(index=pc.Index("rag-class"), embedding=embeddings)
     return vector_store.as_retriever(
         search_type="similarity_score_threshold",
@@ -102,21 +169,35 @@ def get_retriever(k: int = 3, score_threshold: float = 0.7):
     )
 
 
-def format_docs(docs):
-    """ Formats the retrieved documents into a string representation."""
-    if not docs or len(docs) == 0:
-        return None
-    return "\n\n".join(str({"page_content": doc.page_content, "url": doc.metadata["source_url"]}) for doc in docs)
+def get_local_index_retriever(vector_index, embeddings, doc_store, k: int = 3, score_threshold: float = 0.7):
+    """
+    Returns a retriever that searches the local vector index and hydrates
+    the chunk texts and metadata from the local doc store.
+    """
+    def retrieve(question: str):
+        matches = vector_index.search(embeddings.embed_query(question), k)
+        return hydrate_matches(matches, doc_store, score_threshold)
+    return RunnableLambda(retrieve)
 
 
-def is_context_valid(context):
+def get_doc_store_retriever(index, embeddings, doc_store, k: int = 3, score_threshold: float = 0.7):
+    """
+    Returns a retriever that queries the index for ids only and hydrates
+    the chunk texts and metadata from the local doc store.
+    """
+    def retrieve(question: str):
+        result = index.query(vector=embeddings.embed_query(question), top_k=k, include_metadata=False)
+        return hydrate_matches(result["matches"], doc_store, score_threshold)
+    return RunnableLambda(retrieve)
+
+
+def hydrate_matches(matches, doc_store, score_threshold: float = 0.7):
+    """
+    Builds documents for the index matches above the threshold.
+    Scores are cosine similarities in [-1, 1], normalized to [0, 1] like PineconeVectorStore does.
     """
-    Validates that the context is not empty."""
-    if not context or len(context) == 0:
-        print("Context is empty or invalid.")
-        return False
-    print("Context is valid.", len(context))
-    return True
+    return [Document(id=chunk.id, page_content=chunk.page_content, metadata=chunk.metadata)
+            for chunk in hydrate_chunks(matches, doc_store, score_threshold)]
 
 
 def get_retriever_chain(retriever):
@@ -129,19 +210,28 @@ def get_retriever_chain(retriever):
     }
 
 
-def get_rewriter_chain(openai_llm):
+def get_rewriter_chain(openai_llm, backend: str = None):
     """
     Returns a chain that rewrites the question to make it suitable for retrieval.
+    The backend defaults to the REWRITER_BACKEND environment variable.
     """
+    backend = backend or REWRITER_BACKEND
     query_trans_prompt_template = ChatPromptTemplate.from_template(q_trans_prompt_text)
-    return query_trans_prompt_template | openai_llm
+    remote_chain = query_trans_prompt_template | openai_llm
+    if backend == "openai":
+        return remote_chain
+    if backend == "lm_studio":
+        # Imported lazily, the deployed function only uses the remote backend
+        from chat_app.rewriter import get_local_rewriter_chain
+        return get_local_rewriter_chain(remote_chain)
+    raise ValueError(f"Unsupported rewriter backend: {backend}")
 
 
 def stop_step_fn(ctx):
     """
     Returns a default message when invoked.
     """
-    return AIMessage(content="I didn't receive enough information to answer your question.")
+    return AIMessage(content=STOP_MESSAGE)
 
 
 if __name__ == "__main__":
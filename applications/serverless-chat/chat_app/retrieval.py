@@ -0,0 +1,85 @@
+import os
+from collections import namedtuple
+
+from chat_app.doc_store import DocStore
+
+# When set, the index only holds ids and filter fields and chunk texts are read from this local store
+DOC_STORE_PATH = os.getenv("DOC_STORE_PATH")
+# When set together with DOC_STORE_PATH, retrieval runs on this local quantized index instead of Pinecone
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH")
+LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "int8")
+# Reduced embedding size requested from the API, must match the index it is queried against
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None
+if LOCAL_INDEX_PATH and not DOC_STORE_PATH:
+    raise ValueError("LOCAL_INDEX_PATH requires DOC_STORE_PATH, the local index only holds ids and vectors")
+
+STOP_MESSAGE = "I didn't receive enough information to answer your question."
+
+# Retrieved chunk with the same attributes format_docs reads from LangChain documents
+Chunk = namedtuple("Chunk", ["id", "page_content", "metadata"])
+
+_doc_store = None
+_local_index = None
+
+
+def get_doc_store():
+    """
+    Returns the local chunk text store, opened once per container.
+    """
+    global _doc_store
+    if _doc_store is None:
+        _doc_store = DocStore(DOC_STORE_PATH)
+    return _doc_store
+
+
+def get_local_index():
+    """
+    Returns the local quantized vector index, opened once per container.
+    """
+    global _local_index
+    if _local_index is None:
+        # Imported lazily so numpy is only loaded when the local index is used
+        from chat_app.vector_index import VectorIndex
+        _local_index = VectorIndex(LOCAL_INDEX_PATH, quantization=LOCAL_INDEX_QUANTIZATION)
+    return _local_index
+
+
+def relevance_score(score: float) -> float:
+    """
+    Normalizes a cosine similarity in [-1, 1] to [0, 1] like PineconeVectorStore does.
+    """
+    return (score + 1) / 2
+
+
+def hydrate_chunks(matches, doc_store, score_threshold: float = 0.7) -> list[Chunk]:
+    """
+    Reads the texts and metadata of the index matches above the threshold from the doc store.
+    """
+    chunks = []
+    for match in matches:
+        if relevance_score(match["score"]) < score_threshold:
+            continue
+        stored = doc_store.get(match["id"])
+        if stored is None:
+            print(f"Chunk {match['id']} not found in the doc store.")
+            continue
+        text, metadata = stored
+        chunks.append(Chunk(match["id"], text, metadata))
+    return chunks
+
+
+def format_docs(docs):
+    """ Formats the retrieved documents into a string representation."""
+    if not docs or len(docs) == 0:
+        return None
+    return "\n\n".join(str({"page_content": doc.page_content, "url": doc.metadata["source_url"]}) for doc in docs)
+
+
+def is_context_valid(context):
+    """
+    Validates that the context is not empty."""
+    if not context or len(context) == 0:
+        print("Context is empty or invalid.")
+        return False
+    print("Context is valid.", len(context))
+    return True
@@ -0,0 +1,113 @@
+import json
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from chat_app.prompts import q_trans_prompt_text
+
+LM_STUDIO_URL = os.getenv("LM_STUDIO_URL", "http://localhost:1234/v1/chat/completions")
+LM_STUDIO_MODEL = os.getenv("LM_STUDIO_MODEL", "gemma-3-4b-it")
+# (connect, read) timeouts in seconds; the read timeout applies between streamed chunks
+LM_STUDIO_TIMEOUT = (
+    float(os.getenv("LM_STUDIO_CONNECT_TIMEOUT", "1")),
+    float(os.getenv("LM_STUDIO_READ_TIMEOUT", "5")),
+)
+# Hard limit for the whole rewrite, after which the remote model is used instead
+LM_STUDIO_TOTAL_TIMEOUT = float(os.getenv("LM_STUDIO_TOTAL_TIMEOUT", "8"))
+
+_session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Returns a module level requests session with a keep-alive connection pool.
+    The session is reused across warm invocations so the TCP connection to the
+    local server is not re-established on every rewrite.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+        _session.headers.update({"Content-Type": "application/json"})
+    return _session
+
+
+def stream_chat_completion(messages: list, model: str = LM_STUDIO_MODEL, url: str = LM_STUDIO_URL,
+                           timeout=LM_STUDIO_TIMEOUT, total_timeout: float = LM_STUDIO_TOTAL_TIMEOUT,
+                           session: requests.Session = None) -> str:
+    """
+    Calls an OpenAI compatible chat completions endpoint with streaming enabled
+    and returns the concatenated content.
+    Raises requests.Timeout if the whole completion takes longer than total_timeout.
+    """
+    session = session or get_session()
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": 0,
+        "max_tokens": -1,
+        "stream": True,
+    }
+    started = time.monotonic()
+    parts = []
+    with session.post(url, json=data, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if time.monotonic() - started > total_timeout:
+                raise requests.Timeout(f"Streaming completion exceeded {total_timeout}s")
+            delta = parse_stream_line(line)
+            if delta is None:
+                break
+            parts.append(delta)
+    return "".join(parts).strip()
+
+
+def parse_stream_line(line: str):
+    """
+    Parses one server-sent event line of a streamed chat completion.
+    Returns the content delta ("" for keep-alive or empty lines) or None when the stream is done.
+    """
+    if not line or not line.startswith("data:"):
+        return ""
+    payload = line[len("data:"):].strip()
+    if payload == "[DONE]":
+        return None
+    choices = json.loads(payload).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or ""
+
+
+def rewrite_question_locally(question: str, session: requests.Session = None) -> str:
+    """
+    Rewrites the question with the local LM Studio model.
+    """
+    prompt = q_trans_prompt_text.format(question=question)
+    return stream_chat_completion([{"role": "user", "content": prompt}], session=session)
+
+
+def rewrite_with_fallback(question: str, remote_chain, session: requests.Session = None) -> AIMessage:
+    """
+    Rewrites the question with the local model and falls back to the remote chain
+    when the local server is unreachable, too slow, returns an error status or a
+    malformed stream, or returns an empty rewrite.
+    """
+    try:
+        rewritten = rewrite_question_locally(question, session=session)
+        if rewritten:
+            return AIMessage(content=rewritten)
+        print("Local rewriter returned an empty question, using remote model.")
+    except (requests.RequestException, ValueError) as e:
+        print(f"Local rewriter unavailable ({e}), using remote model.")
+    return remote_chain.invoke(question)
+
+
+def get_local_rewriter_chain(remote_chain):
+    """
+    Returns a runnable that rewrites the question with the local model,
+    using remote_chain as fallback. The output is an AIMessage like the remote chain.
+    """
+    return RunnableLambda(lambda question: rewrite_with_fallback(question, remote_chain))
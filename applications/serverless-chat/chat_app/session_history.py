@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import zlib
+from collections import Counter, OrderedDict, namedtuple
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+# Optional codecs, payloads fall back to zlib compressed JSON when they are not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SESSION_CACHE_MAX_BYTES = int(float(os.getenv("SESSION_CACHE_MAX_MB", "16")) * 2**20)
+# The version of a session lives in its own small item, so checking it costs one read unit
+# whatever the size of the history (projections do not reduce the consumed capacity)
+VERSION_KEY_SUFFIX = "#version"
+ZSTD_LEVEL = 3
+# Writes of a turn tried against the latest history before the conflict is raised
+MAX_WRITE_ATTEMPTS = 3
+
+# Cache and DynamoDB calls counted for the lifetime of the container
+_stats = Counter()
+_session_cache = None
+_dynamodb = None
+_serializer = TypeSerializer()
+
+CachedSession = namedtuple("CachedSession", ["version", "payload", "encoding"])
+
+
+def encode_messages(messages: list[dict]) -> tuple[bytes, str]:
+    """
+    Serializes and compresses message dicts with the best available codecs.
+    Returns the payload and its encoding, stored next to it so any container can decode it.
+    """
+    if msgpack is not None:
+        data, serializer = msgpack.packb(messages, use_bin_type=True), "msgpack"
+    else:
+        data, serializer = json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "json"
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), f"zstd+{serializer}"
+    return zlib.compress(data, 6), f"zlib+{serializer}"
+
+
+def decode_messages(payload: bytes, encoding: str) -> list[dict]:
+    compression, serializer = encoding.split("+")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Session history is zstd compressed but zstandard is not installed")
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        data = zlib.decompress(payload)
+    if serializer == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("Session history is msgpack encoded but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+class SessionCache:
+    """
+    LRU of recent session histories kept as compressed payloads, bounded by their total size.
+    """
+
+    def __init__(self, max_bytes: int = SESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, session_id: str):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+            return entry
+
+    def put(self, session_id: str, entry: CachedSession):
+        with self._lock:
+            self._discard(session_id)
+            if len(entry.payload) > self.max_bytes:
+                return
+            self._entries[session_id] = entry
+            self.size += len(entry.payload)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.payload)
+
+    def pop(self, session_id: str):
+        with self._lock:
+            self._discard(session_id)
+
+    def _discard(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self.size -= len(entry.payload)
+
+
+def get_session_cache() -> SessionCache:
+    """
+    Returns the session cache of the container.
+    """
+    global _session_cache
+    if _session_cache is None:
+        _session_cache = SessionCache()
+    return _session_cache
+
+
+def get_table(table_name: str):
+    """
+    Returns the DynamoDB table, the resource is created once per container.
+    """
+    global _dynamodb
+    if _dynamodb is None:
+        _dynamodb = boto3.resource("dynamodb")
+    return _dynamodb.Table(table_name)
+
+
+class CachedDynamoDBChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history stored in DynamoDB as one compressed item per session, with the session
+    version in a small separate item. A session cached by this container is validated by
+    reading only its version; the full history is read on a cache miss or when another
+    container wrote a newer version. Both items are written in one transaction conditional
+    on the version, so concurrent turns of the same session do not overwrite each other and
+    the version item never falls behind the history.
+    Items written by DynamoDBChatMessageHistory (a plain `History` list) are read as version 0.
+    """
+
+    def __init__(self, table_name: str = None, session_id: str = "", table=None, cache: SessionCache = None):
+        self.table = table if table is not None else get_table(table_name)
+        self.session_id = session_id
+        self.cache = cache or get_session_cache()
+        # Validated state of the session for the current turn
+        self._version = None
+        self._messages = None
+
+    @property
+    def messages(self):
+        if self._messages is None:
+            self._load()
+        return messages_from_dict(self._messages)
+
+    @messages.setter
+    def messages(self, messages):
+        raise NotImplementedError("Direct assignment to 'messages' is not allowed, use add_messages instead.")
+
+    def add_messages(self, messages) -> None:
+        if self._messages is None:
+            self._load()
+        new_messages = messages_to_dict(messages)
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            try:
+                self._write(self._messages + new_messages)
+                return
+            except ClientError as e:
+                if not is_write_conflict(e) or attempt == MAX_WRITE_ATTEMPTS - 1:
+                    raise
+                # Another container wrote a turn of this session meanwhile, append to its history
+                _stats["write_conflicts"] += 1
+                self._read_full()
+
+    def clear(self) -> None:
+        self.table.delete_item(Key={"SessionId": self.session_id})
+        self.table.delete_item(Key={"SessionId": self.session_id + VERSION_KEY_SUFFIX})
+        self.cache.pop(self.session_id)
+        self._version, self._messages = 0, []
+
+    def _load(self):
+        cached = self.cache.get(self.session_id)
+        if cached is not None:
+            _stats["version_checks"] += 1
+            if self._read_version() == cached.version:
+                _stats["cache_hits"] += 1
+                self._version, self._messages = cached.version, decode_messages(cached.payload, cached.encoding)
+                return
+        self._read_full()
+
+    def _read_version(self) -> int:
+        item = self.table.get_item(Key={"SessionId": self.session_id + VERSION_KEY_SUFFIX},
+                                   ConsistentRead=True).get("Item")
+        return int(item["Version"]) if item else 0
+
+    def _read_full(self):
+        _stats["full_reads"] += 1
+        item = self.table.get_item(Key={"SessionId": self.session_id}, ConsistentRead=True).get("Item")
+        if item is None:
+            self._version, self._messages = 0, []
+        elif "Payload" in item:
+            payload = bytes(getattr(item["Payload"], "value", item["Payload"]))
+            self._version = int(item["Version"])
+            self._messages = decode_messages(payload, item["Encoding"])
+            self.cache.put(self.session_id, CachedSession(self._version, payload, item["Encoding"]))
+        else:
+            self._version, self._messages = 0, plain_numbers(item.get("History", []))
+
+    def _write(self, messages: list[dict]):
+        payload, encoding = encode_messages(messages)
+        version = self._version + 1
+        history_item = {"SessionId": self.session_id, "Version": version, "Payload": payload, "Encoding": encoding}
+        version_item = {"SessionId": self.session_id + VERSION_KEY_SUFFIX, "Version": version}
+        self.table.meta.client.transact_write_items(TransactItems=[
+            {"Put": {
+                "TableName": self.table.name,
+                "Item": serialize_item(history_item),
+                "ConditionExpression": "attribute_not_exists(Version) OR Version = :expected",
+                "ExpressionAttributeValues": {":expected": _serializer.serialize(self._version)},
+            }},
+            {"Put": {"TableName": self.table.name, "Item": serialize_item(version_item)}},
+        ])
+        _stats["writes"] += 1
+        self._version, self._messages = version, messages
+        self.cache.put(self.session_id, CachedSession(version, payload, encoding))
+
+
+def plain_numbers(value):
+    """
+    Converts the Decimal numbers DynamoDB returns (token usage of legacy History items)
+    back to int and float, so the messages can be encoded again.
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {key: plain_numbers(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain_numbers(item) for item in value]
+    return value
+
+
+def serialize_item(item: dict) -> dict:
+    """
+    Converts an item to the typed attribute values of the low level client API.
+    """
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
+
+def is_write_conflict(error: ClientError) -> bool:
+    """
+    Tells whether a write failed because the session changed meanwhile: the version
+    condition failed or another transaction was writing the same items.
+    """
+    if error.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+        return False
+    reasons = error.response.get("CancellationReasons") or []
+    return any(reason.get("Code") in ("ConditionalCheckFailed", "TransactionConflict") for reason in reasons)
+
+
+def get_session_cache_stats() -> dict:
+    """
+    Returns the cache and DynamoDB call counts of the container, with the share of turns
+    that skipped the full history read.
+    """
+    loads = _stats["cache_hits"] + _stats["full_reads"] - _stats["write_conflicts"]
+    return {**_stats, "skipped_read_ratio": _stats["cache_hits"] / loads if loads else 0.0}
+
+
+def reset_session_cache_stats():
+    _stats.clear()
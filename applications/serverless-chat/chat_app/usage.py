@@ -0,0 +1,83 @@
+from collections import defaultdict
+
+# Token usage per pipeline stage, accumulated for the lifetime of the container
+_usage_by_stage = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0})
+
+
+def get_token_usage(message) -> dict:
+    """
+    Extracts input, cached and output tokens from an LLM response message.
+    Reads the normalized usage_metadata first and falls back to the raw
+    OpenAI token_usage (prompt_tokens_details.cached_tokens).
+    Messages without usage data (fallback messages, local models) return zeros.
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    if isinstance(usage, dict) and usage:
+        details = usage.get("input_token_details") or {}
+        return {
+            "input_tokens": usage.get("input_tokens") or 0,
+            "cached_tokens": details.get("cache_read") or 0,
+            "output_tokens": usage.get("output_tokens") or 0,
+        }
+    metadata = getattr(message, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") if isinstance(metadata, dict) else None
+    return parse_openai_usage(token_usage)
+
+
+def parse_openai_usage(token_usage) -> dict:
+    """
+    Extracts input, cached and output tokens from the raw OpenAI `usage` object.
+    """
+    if not token_usage:
+        return {"input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return {
+        "input_tokens": token_usage.get("prompt_tokens") or 0,
+        "cached_tokens": details.get("cached_tokens") or 0,
+        "output_tokens": token_usage.get("completion_tokens") or 0,
+    }
+
+
+def record_usage(stage: str, message) -> dict:
+    """
+    Adds the token usage of the message to the stage totals and logs the cache hit ratio.
+    Returns the usage of this message.
+    """
+    return record_token_usage(stage, get_token_usage(message))
+
+
+def record_token_usage(stage: str, usage: dict) -> dict:
+    """
+    Adds already extracted token usage to the stage totals, used by the direct HTTP pipeline.
+    """
+    if not usage["input_tokens"]:
+        return usage
+    totals = _usage_by_stage[stage]
+    totals["calls"] += 1
+    for key, value in usage.items():
+        totals[key] += value
+    print(f"Token usage [{stage}]: input={usage['input_tokens']} cached={usage['cached_tokens']} "
+          f"output={usage['output_tokens']} cache_hit_ratio={get_cache_hit_ratio(stage):.2f}")
+    return usage
+
+
+def get_cache_hit_ratio(stage: str) -> float:
+    """
+    Returns the share of input tokens served from the provider prompt cache for the stage.
+    """
+    totals = _usage_by_stage.get(stage)
+    if not totals or not totals["input_tokens"]:
+        return 0.0
+    return totals["cached_tokens"] / totals["input_tokens"]
+
+
+def get_usage_report() -> dict:
+    """
+    Returns the accumulated usage per stage including its cache hit ratio.
+    """
+    return {stage: {**totals, "cache_hit_ratio": get_cache_hit_ratio(stage)}
+            for stage, totals in _usage_by_stage.items()}
+
+
+def reset_usage():
+    _usage_by_stage.clear()
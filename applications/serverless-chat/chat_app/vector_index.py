@@ -0,0 +1,189 @@
+import json
+import os
+
+import numpy as np
+
+IDS_FILE = "ids.json"
+VECTORS_FILE = "vectors.f32"
+INT8_FILE = "codes_int8.npy"
+INT8_CALIBRATION_FILE = "int8_calibration.npy"
+BINARY_FILE = "codes_binary.npy"
+META_FILE = "vector_index.json"
+
+QUANTIZATIONS = ("float32", "int8", "binary")
+
+# Rows scanned at a time during search, small blocks keep the int8 to float32 conversion in CPU cache
+SEARCH_BLOCK_ROWS = 256
+# Popcount of every byte value, used for hamming distances on packed binary codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def reduce_dimensions(vectors, dimensions: int):
+    """
+    Truncates and re-normalizes embeddings, which is how text-embedding-3 models shorten
+    vectors when the `dimensions` parameter is requested from the API.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)[..., :dimensions]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class VectorIndexWriter:
+    """
+    Writes a local vector index: full precision vectors streamed to a raw float32 file,
+    plus int8 scalar and binary quantized codes computed on close().
+    """
+
+    def __init__(self, path: str, dimensions: int):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dimensions = dimensions
+        self._ids = []
+        self._vectors = open(os.path.join(path, VECTORS_FILE), "wb")
+
+    def add(self, chunk_id: str, vector):
+        vector = reduce_dimensions(vector, self.dimensions)
+        if vector.shape != (self.dimensions,):
+            raise ValueError(f"Expected a vector with {self.dimensions} dimensions, got {vector.shape}")
+        self._vectors.write(vector.tobytes())
+        self._ids.append(chunk_id)
+
+    def close(self):
+        self._vectors.close()
+        vectors = load_vectors(self.path, len(self._ids), self.dimensions)
+        low, high = calibrate_int8(vectors)
+        np.save(os.path.join(self.path, INT8_CALIBRATION_FILE), np.stack([low, high]))
+        int8_codes = np.lib.format.open_memmap(os.path.join(self.path, INT8_FILE), mode="w+",
+                                               dtype=np.int8, shape=vectors.shape)
+        binary_codes = np.lib.format.open_memmap(os.path.join(self.path, BINARY_FILE), mode="w+", dtype=np.uint8,
+                                                 shape=(len(self._ids), (self.dimensions + 7) // 8))
+        for start in range(0, len(self._ids), SEARCH_BLOCK_ROWS):
+            block = vectors[start:start + SEARCH_BLOCK_ROWS]
+            int8_codes[start:start + len(block)] = quantize_int8(block, low, high)
+            binary_codes[start:start + len(block)] = np.packbits(block > 0, axis=1)
+        int8_codes.flush()
+        binary_codes.flush()
+        with open(os.path.join(self.path, IDS_FILE), "w", encoding="utf-8") as file:
+            json.dump(self._ids, file)
+        with open(os.path.join(self.path, META_FILE), "w", encoding="utf-8") as file:
+            json.dump({"count": len(self._ids), "dimensions": self.dimensions}, file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_vectors(path: str, count: int, dimensions: int):
+    if count == 0:
+        return np.zeros((0, dimensions), dtype=np.float32)
+    return np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dimensions))
+
+
+def calibrate_int8(vectors):
+    """
+    Returns the per dimension range used for int8 quantization, clipped to the
+    0.1% and 99.9% percentiles so a few outliers do not waste the code range.
+    """
+    if len(vectors) == 0:
+        return np.zeros(vectors.shape[1], np.float32), np.ones(vectors.shape[1], np.float32)
+    low = np.percentile(vectors, 0.1, axis=0).astype(np.float32)
+    high = np.percentile(vectors, 99.9, axis=0).astype(np.float32)
+    return low, np.maximum(high, low + 1e-6)
+
+
+def quantize_int8(vectors, low, high):
+    scaled = (np.clip(vectors, low, high) - low) / (high - low)
+    return (np.round(scaled * 255) - 128).astype(np.int8)
+
+
+class VectorIndex:
+    """
+    Read only cosine similarity search over an index written by VectorIndexWriter.
+    All files are memory mapped. With int8 or binary quantization the whole index is scanned
+    on the compact codes and only the best k * rescore_multiplier candidates are
+    rescored with the full precision vectors.
+    """
+
+    def __init__(self, path: str, quantization: str = "int8", rescore_multiplier: int = 4):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as file:
+            meta = json.load(file)
+        with open(os.path.join(path, IDS_FILE), encoding="utf-8") as file:
+            self.ids = json.load(file)
+        self.dimensions = meta["dimensions"]
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        self.vectors = load_vectors(path, meta["count"], self.dimensions)
+        self.codes = None
+        if quantization == "int8" and meta["count"]:
+            self.codes = np.load(os.path.join(path, INT8_FILE), mmap_mode="r")
+            self.low, self.high = np.load(os.path.join(path, INT8_CALIBRATION_FILE))
+        elif quantization == "binary" and meta["count"]:
+            self.codes = np.load(os.path.join(path, BINARY_FILE), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def code_bytes(self) -> int:
+        """
+        Returns the bytes scanned per query, the memory the index needs to stay resident.
+        """
+        return self.vectors.nbytes if self.codes is None else self.codes.nbytes
+
+    def search(self, query, k: int = 3) -> list[dict]:
+        """
+        Returns up to k matches as {"id", "score"} sorted by cosine similarity.
+        """
+        if len(self.ids) == 0:
+            return []
+        query = reduce_dimensions(query, self.dimensions)
+        if self.codes is None:
+            rows = top_k(self._scan(self.vectors, query), k)
+        else:
+            scores = self._approximate_scores(query)
+            candidates = top_k(scores, k * self.rescore_multiplier)
+            candidates.sort()  # sequential reads from the mapped vectors
+            exact = np.asarray(self.vectors[candidates]) @ query
+            rows = candidates[top_k(exact, k)]
+        exact_scores = np.asarray(self.vectors[rows]) @ query
+        return [{"id": self.ids[row], "score": float(score)} for row, score in zip(rows, exact_scores)]
+
+    def _approximate_scores(self, query):
+        if self.quantization == "binary":
+            query_bits = np.packbits(query > 0)
+            scores = np.empty(len(self.ids), dtype=np.int32)
+            for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS):
+                block = self.codes[start:start + SEARCH_BLOCK_ROWS]
+                # Lower hamming distance means higher similarity
+                scores[start:start + len(block)] = -popcount(np.bitwise_xor(block, query_bits)).sum(axis=1, dtype=np.int32)
+            return scores
+        # x ~= low + (code + 128) / 255 * (high - low), the constant part does not change the ranking
+        weights = (query * (self.high - self.low) / 255).astype(np.float32)
+        return self._scan(self.codes, weights)
+
+    @staticmethod
+    def _scan(matrix, query):
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), SEARCH_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores
+
+
+def popcount(values):
+    # numpy >= 2.0 has a native popcount, older versions use the lookup table
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values]
+
+
+def top_k(scores, k: int):
+    """
+    Returns the indexes of the k highest scores, best first.
+    """
+    k = min(k, len(scores))
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a provider call was never recorded."""
+
+
+class Cassette:
+    """
+    Records provider responses and their latency to a JSON file, and replays them
+    deterministically without network access.
+    Entries are keyed by a hash of the call kind and its JSON serializable request.
+    """
+
+    def __init__(self, path: str, record: bool = False):
+        self.path = path
+        self.record = record
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self._entries = json.load(file)
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(kind: str, request) -> str:
+        payload = json.dumps([kind, request], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def call(self, kind: str, request, fn):
+        """
+        Returns (response, latency_ms) of the call, from the cassette when it was recorded.
+        In record mode missing entries are produced by fn() and stored.
+        """
+        key = self.key(kind, request)
+        entry = self._entries.get(key)
+        if entry is None:
+            if not self.record:
+                self.misses += 1
+                raise CassetteMiss(f"{kind} call not recorded, run the evaluation with --record: {request!r:.200}")
+            started = time.perf_counter()
+            response = fn()
+            entry = {"kind": kind, "response": response, "latency_ms": (time.perf_counter() - started) * 1000}
+            with self._lock:
+                self._entries[key] = entry
+        return entry["response"], entry["latency_ms"]
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file, ensure_ascii=False, indent=1, sort_keys=True)
@@ -0,0 +1,282 @@
+"""
+Retrieval and answer quality regression suite for the QA pipeline.
+
+Runs the golden question set through run_qa_with_deadline, the rewrite -> retrieve ->
+validate -> answer pipeline the Lambda handler runs (it always has a deadline there), for
+several configurations and reports recall@k, MRR, the rate at which the stop message
+fallback fires, tokens per answer and per stage latency.
+
+Provider calls (chat completions and vector searches) are recorded once to a cassette
+and replayed deterministically, so the suite runs without network access. Searches are
+recorded SEARCH_DEPTH deep and shared by every configuration, so a new k or score_threshold
+only needs its answers recorded. Calls missing from the cassette fail the replay, record
+them again after changing a configuration, the prompts or the model.
+
+Usage (from applications/serverless-chat):
+    python -m evaluation.suite --record          # once, with API keys
+    python -m evaluation.suite                   # offline, fails on budget regressions
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from chat_app import qa_chat
+from chat_app.deadline import Deadline
+from chat_app.prompts import get_qa_prompt_template, q_trans_prompt_text
+from evaluation.cassette import Cassette
+
+EVALUATION_DIR = Path(__file__).resolve().parent
+GOLDEN_FILE = EVALUATION_DIR.parent / "benchmarks" / "confluence_questions.json"
+CASSETTE_FILE = EVALUATION_DIR / "cassettes" / "qa.json"
+BUDGETS_FILE = EVALUATION_DIR / "budgets.json"
+SEARCH_DEPTH = 10
+# Deadline of every question, the 180 s function timeout of template.yaml minus the response reserve
+DEADLINE_S = 179
+STAGES = ("rewrite", "retrieve", "answer", "overhead", "total")
+
+
+@dataclass
+class EvalConfig:
+    name: str
+    k: int = 3
+    score_threshold: float = 0.7
+    rewrite_prompt: str = q_trans_prompt_text
+    index: str = "rag-class"
+    model: str = "gpt-4.1-nano"
+
+
+CONFIGS = {
+    "baseline": EvalConfig("baseline"),
+    "k5": EvalConfig("k5", k=5),
+    "threshold_0.75": EvalConfig("threshold_0.75", score_threshold=0.75),
+}
+
+
+@dataclass
+class QuestionResult:
+    question: str
+    expected_url: str
+    retrieved_urls: list = field(default_factory=list)
+    fallback: bool = False
+    tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: dict = field(default_factory=dict)
+
+
+def default_providers():
+    """
+    Real providers, only used while recording.
+    """
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from langchain_pinecone import PineconeVectorStore
+    from pinecone import Pinecone
+
+    def llm(model):
+        return ChatOpenAI(model=model, temperature=0.7)
+
+    def vector_store(index):
+        pc = Pinecone(api_key=qa_chat.pinecone_api_key)
+        return PineconeVectorStore(index=pc.Index(index), embedding=OpenAIEmbeddings(model="text-embedding-3-small"))
+
+    return {"llm": llm, "vector_store": vector_store}
+
+
+def recorded_llm(cassette: Cassette, config: EvalConfig, stage: str, result: QuestionResult, providers):
+    """
+    Returns a runnable that answers prompts from the cassette, like the chat model would.
+    """
+    def invoke(prompt_value):
+        messages = [{"type": m.type, "content": m.content} for m in prompt_value.to_messages()]
+
+        def call():
+            message = providers()["llm"](config.model).invoke(prompt_value)
+            return {"content": message.content, "usage_metadata": message.usage_metadata}
+
+        response, latency_ms = cassette.call("chat", {"model": config.model, "messages": messages}, call)
+        result.latency_ms[stage] = latency_ms
+        usage = response.get("usage_metadata") or {}
+        result.tokens += usage.get("total_tokens", 0)
+        if stage == "answer":
+            result.output_tokens = usage.get("output_tokens", 0)
+        return AIMessage(content=response["content"])
+
+    return RunnableLambda(invoke)
+
+
+def recorded_retriever(cassette: Cassette, config: EvalConfig, result: QuestionResult, providers):
+    """
+    Returns a runnable that retrieves documents from the recorded search, applying k and
+    the score threshold like the similarity_score_threshold retriever does.
+    """
+    def retrieve(question: str):
+        def call():
+            store = providers()["vector_store"](config.index)
+            return [{"page_content": doc.page_content, "metadata": doc.metadata, "score": score}
+                    for doc, score in store.similarity_search_with_relevance_scores(question, k=SEARCH_DEPTH)]
+
+        request = {"index": config.index, "query": question, "depth": SEARCH_DEPTH}
+        response, latency_ms = cassette.call("search", request, call)
+        result.latency_ms["retrieve"] = latency_ms
+        hits = [hit for hit in response[:config.k] if hit["score"] >= config.score_threshold]
+        result.retrieved_urls = [hit["metadata"].get("source_url") for hit in hits]
+        return [Document(page_content=hit["page_content"], metadata=hit["metadata"]) for hit in hits]
+
+    return RunnableLambda(retrieve)
+
+
+def run_question(item: dict, config: EvalConfig, cassette: Cassette, providers=default_providers) -> QuestionResult:
+    """
+    Runs one golden question through run_qa_with_deadline built from recorded providers.
+    """
+    result = QuestionResult(item["question"], item["source_url"])
+    rewrite_chain = ChatPromptTemplate.from_template(config.rewrite_prompt) | \
+        recorded_llm(cassette, config, "rewrite", result, providers)
+    call_llm = get_qa_prompt_template() | recorded_llm(cassette, config, "answer", result, providers)
+
+    def make_retriever(k: int, score_threshold: float):
+        return recorded_retriever(cassette, replace(config, k=k, score_threshold=score_threshold), result, providers)
+
+    started = time.perf_counter()
+    answer = qa_chat.run_qa_with_deadline(item["question"], Deadline(DEADLINE_S), rewrite_chain, call_llm,
+                                          make_retriever, config.k, config.score_threshold)
+    wall_ms = (time.perf_counter() - started) * 1000
+    provider_ms = sum(result.latency_ms.values())
+    # While replaying the wall time only contains local work
+    result.latency_ms["overhead"] = max(wall_ms - provider_ms, 0.0) if cassette.record else wall_ms
+    result.latency_ms["total"] = provider_ms + result.latency_ms["overhead"]
+    result.fallback = answer == qa_chat.STOP_MESSAGE
+    return result
+
+
+def reciprocal_rank(expected_url: str, retrieved_urls: list) -> float:
+    for rank, url in enumerate(retrieved_urls, start=1):
+        if url == expected_url:
+            return 1 / rank
+    return 0.0
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(results: list) -> dict:
+    """
+    Aggregates the per question results into the suite metrics.
+    """
+    latency = {}
+    for stage in STAGES:
+        values = [r.latency_ms[stage] for r in results if stage in r.latency_ms]
+        latency[stage] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+    return {
+        "questions": len(results),
+        "recall_at_k": statistics.mean(r.expected_url in r.retrieved_urls for r in results),
+        "mrr": statistics.mean(reciprocal_rank(r.expected_url, r.retrieved_urls) for r in results),
+        "fallback_rate": statistics.mean(r.fallback for r in results),
+        "tokens_per_answer": statistics.mean(r.tokens for r in results),
+        "output_tokens_per_answer": statistics.mean(r.output_tokens for r in results),
+        "latency_ms": latency,
+    }
+
+
+def evaluate(config: EvalConfig, questions: list, cassette: Cassette, providers=default_providers) -> dict:
+    return summarize([run_question(item, config, cassette, providers) for item in questions])
+
+
+def check_budgets(name: str, metrics: dict, budgets: dict) -> list:
+    """
+    Returns the absolute budget violations of a configuration.
+    """
+    violations = []
+    for metric in ("recall_at_k", "mrr"):
+        if metrics[metric] < budgets[f"min_{metric}"]:
+            violations.append(f"{name}: {metric} {metrics[metric]:.3f} < {budgets[f'min_{metric}']}")
+    for metric in ("fallback_rate", "tokens_per_answer"):
+        if metrics[metric] > budgets[f"max_{metric}"]:
+            violations.append(f"{name}: {metric} {metrics[metric]:.3f} > {budgets[f'max_{metric}']}")
+    for stage, limit in budgets["max_p95_ms"].items():
+        if metrics["latency_ms"][stage]["p95"] > limit:
+            violations.append(f"{name}: {stage} p95 {metrics['latency_ms'][stage]['p95']:.0f}ms > {limit}ms")
+    return violations
+
+
+def check_regression(name: str, baseline: dict, candidate: dict, tolerances: dict) -> list:
+    """
+    Returns the regressions of a configuration against the baseline configuration.
+    """
+    violations = []
+    for metric in ("recall_at_k", "mrr"):
+        if candidate[metric] < baseline[metric] - tolerances[metric]:
+            violations.append(f"{name}: {metric} dropped {baseline[metric]:.3f} -> {candidate[metric]:.3f}")
+    if candidate["fallback_rate"] > baseline["fallback_rate"] + tolerances["fallback_rate"]:
+        violations.append(f"{name}: fallback_rate rose {baseline['fallback_rate']:.3f} -> {candidate['fallback_rate']:.3f}")
+    if candidate["tokens_per_answer"] > baseline["tokens_per_answer"] * (1 + tolerances["tokens_ratio"]):
+        violations.append(f"{name}: tokens_per_answer rose {baseline['tokens_per_answer']:.0f} -> "
+                          f"{candidate['tokens_per_answer']:.0f}")
+    for stage in STAGES:
+        before, after = baseline["latency_ms"][stage]["p95"], candidate["latency_ms"][stage]["p95"]
+        if after > before * (1 + tolerances["latency_ratio"]) + tolerances["latency_ms"]:
+            violations.append(f"{name}: {stage} p95 rose {before:.0f}ms -> {after:.0f}ms")
+    return violations
+
+
+def load_questions() -> list:
+    return json.loads(GOLDEN_FILE.read_text(encoding="utf-8"))
+
+
+def load_budgets() -> dict:
+    return json.loads(BUDGETS_FILE.read_text(encoding="utf-8"))
+
+
+def print_metrics(name: str, metrics: dict):
+    latency = " ".join(f"{stage}={metrics['latency_ms'][stage]['p95']:.0f}ms" for stage in STAGES)
+    print(f"{name:<16} recall@k={metrics['recall_at_k']:.3f} mrr={metrics['mrr']:.3f} "
+          f"fallback={metrics['fallback_rate']:.3f} tokens={metrics['tokens_per_answer']:.0f} p95: {latency}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", action="store_true", help="Call the providers for calls missing in the cassette")
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS), help="Configurations to run")
+    parser.add_argument("--baseline", default="baseline", choices=sorted(CONFIGS))
+    parser.add_argument("--cassette", default=str(CASSETTE_FILE))
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette, record=args.record)
+    questions = load_questions()
+    budgets = load_budgets()
+    names = [args.baseline] + [name for name in (args.config or CONFIGS) if name != args.baseline]
+    results = {}
+    try:
+        for name in names:
+            results[name] = evaluate(CONFIGS[name], questions, cassette)
+    finally:
+        if args.record:
+            cassette.save()
+
+    violations = []
+    for name, metrics in results.items():
+        print_metrics(name, metrics)
+        violations += check_budgets(name, metrics, budgets["absolute"])
+        if name != args.baseline:
+            violations += check_regression(name, results[args.baseline], metrics, budgets["regression"])
+    for violation in violations:
+        print(f"FAIL {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,34 @@
+# Offline quality and latency regression suite, replays the recorded provider calls
+import pytest
+
+from evaluation import suite
+from evaluation.cassette import Cassette
+
+pytestmark = pytest.mark.evaluation
+
+if not suite.CASSETTE_FILE.exists():
+    pytest.skip("No recorded cassette, run python -m evaluation.suite --record", allow_module_level=True)
+
+
+@pytest.fixture(scope="module")
+def results():
+    cassette = Cassette(str(suite.CASSETTE_FILE))
+    questions = suite.load_questions()
+    return {name: suite.evaluate(config, questions, cassette) for name, config in suite.CONFIGS.items()}
+
+
+@pytest.fixture(scope="module")
+def budgets():
+    return suite.load_budgets()
+
+
+# Test that every configuration stays within the absolute quality and latency budgets
+@pytest.mark.parametrize("name", sorted(suite.CONFIGS))
+def test_budgets(results, budgets, name):
+    assert suite.check_budgets(name, results[name], budgets["absolute"]) == []
+
+
+# Test that no configuration regresses against the baseline configuration
+@pytest.mark.parametrize("name", sorted(set(suite.CONFIGS) - {"baseline"}))
+def test_no_regression_against_baseline(results, budgets, name):
+    assert suite.check_regression(name, results["baseline"], results[name], budgets["regression"]) == []
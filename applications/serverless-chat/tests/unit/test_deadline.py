@@ -0,0 +1,112 @@
+# Unit tests for deadline.py, request deadlines, stage budgets and degradation counters
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from chat_app import deadline as dl
+
+
+@pytest.fixture(autouse=True)
+def clean_degradations():
+    dl.reset_degradations()
+    yield
+    dl.reset_degradations()
+
+
+# Test that the deadline is the earliest of the Lambda deadline minus the reserve and the client SLA
+def test_from_lambda_context():
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 10000
+    assert 8.5 < dl.Deadline.from_lambda_context(context).remaining() <= 10 - dl.RESPONSE_RESERVE_MS / 1000
+    assert 1.5 < dl.Deadline.from_lambda_context(context, sla_ms=2000).remaining() <= 2
+    assert dl.Deadline.from_lambda_context("", None) is None
+
+
+# Test that a stage budget never eats the time reserved for the next stages
+def test_budget_keeps_reserve():
+    deadline = dl.Deadline(4)
+    assert dl.rewrite_budget(deadline) == pytest.approx(4 - dl.ANSWER_MIN_S - dl.MIN_STAGE_S, abs=0.05)
+    assert dl.Deadline(1).budget(2, reserve=3) == 0
+
+
+# Test that the stage limits only apply when the deadline is tight
+def test_budget_uncapped_when_time_is_ample():
+    ample = dl.Deadline(170)
+    assert dl.retrieve_budget(ample) == pytest.approx(170 - dl.ANSWER_MIN_S, abs=0.05)
+    assert dl.rewrite_budget(ample) == pytest.approx(170 - dl.RETRIEVE_BUDGET_S - dl.ANSWER_MIN_S, abs=0.05)
+    tight = dl.Deadline(dl.TIGHT_DEADLINE_S - 0.5)
+    assert dl.retrieve_budget(tight) == dl.RETRIEVE_BUDGET_S
+    assert dl.rewrite_budget(tight) == dl.REWRITE_BUDGET_S
+
+
+# Test that k is lowered and counted only when time is tight
+def test_choose_k():
+    assert dl.choose_k(dl.Deadline(60), 3) == 3
+    assert dl.choose_k(dl.Deadline(4), 3) == dl.REDUCED_K
+    assert dl.get_degradation_report() == {"k_lowered": 1}
+
+
+# Test that call_with_timeout returns results, and raises StageTimeout for slow or unstartable stages
+def test_call_with_timeout():
+    assert dl.call_with_timeout(lambda x: x + 1, 1, 1) == 2
+    with pytest.raises(dl.StageTimeout):
+        dl.call_with_timeout(time.sleep, 0.3, 2)
+    with pytest.raises(dl.StageTimeout):
+        dl.call_with_timeout(lambda: 1, 0.01)
+
+
+# Test that stalled stage calls do not block the stages started after them
+def test_stalled_calls_do_not_block_new_stages():
+    import threading
+    release = threading.Event()
+    try:
+        # More stalled calls than the 8 workers the stages used to share
+        for _ in range(9):
+            with pytest.raises(dl.StageTimeout):
+                dl.call_with_timeout(release.wait, dl.MIN_STAGE_S)
+        stalled_streams = [dl.DeadlineStream(lambda: iter([release.wait()]), dl.Deadline(0.01)) for _ in range(9)]
+        assert all(list(stream) == [] for stream in stalled_streams)
+
+        assert dl.call_with_timeout(lambda: "fast", 2.0) == "fast"
+        assert list(dl.DeadlineStream(lambda: iter(["a", "b"]), dl.Deadline(2))) == ["a", "b"]
+    finally:
+        release.set()
+
+
+# Test that DeadlineStream yields the items produced before the deadline and flags the truncation
+def test_deadline_stream_truncates():
+    def slow_stream():
+        yield "a"
+        yield "b"
+        time.sleep(2)
+        yield "c"
+
+    stream = dl.DeadlineStream(slow_stream, dl.Deadline(0.3))
+    assert list(stream) == ["a", "b"]
+    assert stream.truncated
+
+
+# Test that DeadlineStream forwards complete streams and errors
+def test_deadline_stream_complete_and_error():
+    stream = dl.DeadlineStream(lambda: iter(["a", "b"]), dl.Deadline(5))
+    assert list(stream) == ["a", "b"]
+    assert not stream.truncated
+
+    def failing():
+        yield "a"
+        raise RuntimeError("provider error")
+
+    with pytest.raises(RuntimeError):
+        list(dl.DeadlineStream(failing, dl.Deadline(5)))
+
+
+# Test that the context cache normalizes questions and evicts the least recently used entry
+def test_context_cache_lru():
+    cache = dl.ContextCache(max_entries=2)
+    cache.put("Who runs Peru?", "ctx-1")
+    cache.put("dress code", "ctx-2")
+    assert cache.get("  who runs   peru? ") == "ctx-1"
+    cache.put("holidays", "ctx-3")
+    assert cache.get("dress code") is None
+    assert cache.get("who runs peru?") == "ctx-1"
@@ -0,0 +1,46 @@
+# Unit tests for doc_store.py
+import pytest
+
+from chat_app.doc_store import DocStore, DocStoreWriter
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    with DocStoreWriter(str(tmp_path)) as writer:
+        writer.add("id-1", "First chunk", {"source": "confluence", "source_url": "url-1"})
+        writer.add("id-2", "Segundo fragmento, año ñandú", {"source": "confluence", "source_url": "url-2"})
+        writer.add("id-3", "No metadata")
+        writer.add("id-4", "Late column", {"title": "Title"})
+    return str(tmp_path)
+
+
+# Test that texts and metadata are returned for every stored id
+def test_doc_store_get(store_path):
+    store = DocStore(store_path)
+    assert len(store) == 4
+    assert store.get("id-1") == ("First chunk", {"source": "confluence", "source_url": "url-1"})
+    assert store.get_text("id-2") == "Segundo fragmento, año ñandú"
+    assert store.get_metadata("id-2") == {"source": "confluence", "source_url": "url-2"}
+
+
+# Test that missing metadata fields are not returned, including columns added after the first rows
+def test_doc_store_sparse_metadata(store_path):
+    store = DocStore(store_path)
+    assert store.get_metadata("id-3") == {}
+    assert store.get_metadata("id-4") == {"title": "Title"}
+
+
+# Test that unknown ids return None
+def test_doc_store_missing_id(store_path):
+    store = DocStore(store_path)
+    assert "missing" not in store
+    assert store.get("missing") is None
+    assert store.get_text("missing") is None
+
+
+# Test that an empty store can be opened
+def test_doc_store_empty(tmp_path):
+    DocStoreWriter(str(tmp_path)).close()
+    store = DocStore(str(tmp_path))
+    assert len(store) == 0
+    assert store.get("id-1") is None
@@ -0,0 +1,93 @@
+# Unit tests for the offline evaluation suite
+import sys
+
+import pytest
+from unittest.mock import MagicMock
+
+import langchain_core.prompts
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+
+from evaluation import suite
+from evaluation.cassette import Cassette, CassetteMiss
+
+STRICT = suite.EvalConfig("strict", score_threshold=0.85)
+EMPTY = suite.EvalConfig("empty", score_threshold=0.95)
+QUESTIONS = [
+    {"question": "Which days are holidays in Peru?", "source_url": "url-peru"},
+    {"question": "What is the dress code?", "source_url": "url-dress"},
+]
+
+
+@pytest.fixture(autouse=True)
+def real_prompts(monkeypatch):
+    # test_qa replaces langchain_core.prompts with a mock, the suite builds the real prompt templates
+    monkeypatch.setitem(sys.modules, "langchain_core.prompts", langchain_core.prompts)
+
+
+def fake_providers():
+    llm = MagicMock()
+    llm.invoke.return_value = AIMessage(content="answer", usage_metadata={
+        "input_tokens": 90, "output_tokens": 10, "total_tokens": 100})
+    store = MagicMock()
+    store.similarity_search_with_relevance_scores.return_value = [
+        (Document(page_content="dress", metadata={"source_url": "url-dress"}), 0.9),
+        (Document(page_content="peru", metadata={"source_url": "url-peru"}), 0.8),
+        (Document(page_content="other", metadata={"source_url": "url-other"}), 0.6),
+    ]
+    return {"llm": lambda model: llm, "vector_store": lambda index: store}
+
+
+@pytest.fixture
+def recorded_cassette(tmp_path):
+    cassette = Cassette(str(tmp_path / "qa.json"), record=True)
+    for config in (suite.CONFIGS["baseline"], STRICT, EMPTY):
+        suite.evaluate(config, QUESTIONS, cassette, fake_providers)
+    cassette.save()
+    return str(tmp_path / "qa.json")
+
+
+# Test that replay raises CassetteMiss for calls that were never recorded
+def test_cassette_miss(tmp_path):
+    cassette = Cassette(str(tmp_path / "missing.json"))
+    with pytest.raises(CassetteMiss):
+        cassette.call("chat", {"messages": []}, lambda: "never called")
+
+
+# Test that a replayed evaluation gives the recorded quality metrics without calling providers
+def test_replay_matches_recording(recorded_cassette):
+    def no_providers():
+        raise AssertionError("providers must not be called while replaying")
+
+    metrics = suite.evaluate(suite.CONFIGS["baseline"], QUESTIONS, Cassette(recorded_cassette), no_providers)
+    assert metrics["questions"] == 2
+    assert metrics["recall_at_k"] == 1.0
+    assert metrics["mrr"] == pytest.approx((1 / 2 + 1) / 2)
+    assert metrics["fallback_rate"] == 0.0
+    assert metrics["tokens_per_answer"] == 200
+
+
+# Test that the score threshold is applied on the recorded search
+def test_threshold_applied_offline(recorded_cassette):
+    metrics = suite.evaluate(STRICT, QUESTIONS, Cassette(recorded_cassette), lambda: None)
+    assert metrics["recall_at_k"] == 0.5
+
+
+# Test that an empty retrieval makes the stop message fallback fire
+def test_fallback_rate(recorded_cassette):
+    metrics = suite.evaluate(EMPTY, QUESTIONS, Cassette(recorded_cassette), lambda: None)
+    assert metrics["fallback_rate"] == 1.0
+    assert metrics["recall_at_k"] == 0.0
+
+
+# Test that quality and latency regressions against the baseline are reported
+def test_check_regression():
+    latency = {stage: {"p50": 100, "p95": 100} for stage in suite.STAGES}
+    baseline = {"recall_at_k": 0.9, "mrr": 0.8, "fallback_rate": 0.0, "tokens_per_answer": 500, "latency_ms": latency}
+    slower = {stage: {"p50": 100, "p95": 400} for stage in suite.STAGES}
+    candidate = {**baseline, "recall_at_k": 0.7, "latency_ms": slower}
+    tolerances = suite.load_budgets()["regression"]
+    violations = suite.check_regression("candidate", baseline, candidate, tolerances)
+    assert any("recall_at_k" in v for v in violations)
+    assert any("answer p95" in v for v in violations)
+    assert suite.check_regression("same", baseline, baseline, tolerances) == []
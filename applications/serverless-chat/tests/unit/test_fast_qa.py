@@ -0,0 +1,139 @@
+# Unit tests for fast_qa.py, the direct HTTP QA pipeline, against a mocked HTTP transport
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from chat_app import deadline as dl
+from chat_app import fast_qa, usage
+from chat_app.retrieval import STOP_MESSAGE
+
+
+def make_client(matches, requests):
+    def handler(request: httpx.Request):
+        body = json.loads(request.content)
+        requests.append((request.url.path, body))
+        if request.url.path.endswith("/chat/completions"):
+            rewrite = body["messages"][0]["role"] == "user"
+            content = "rewritten question" if rewrite else "final answer"
+            return httpx.Response(200, json={"choices": [{"message": {"content": content}}],
+                                             "usage": {"prompt_tokens": 100, "completion_tokens": 5}})
+        if request.url.path.endswith("/embeddings"):
+            return httpx.Response(200, json={"data": [{"embedding": [0.1, 0.2]}]})
+        if request.url.path == "/query":
+            return httpx.Response(200, json={"matches": matches})
+        return httpx.Response(404)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture(autouse=True)
+def index_host(monkeypatch):
+    monkeypatch.setattr(fast_qa, "_index_host", "index.test")
+    monkeypatch.setattr(fast_qa, "LOCAL_INDEX_PATH", None)
+    monkeypatch.setattr(fast_qa, "DOC_STORE_PATH", None)
+    usage.reset_usage()
+    dl.reset_degradations()
+    monkeypatch.setattr(dl, "_context_cache", None)
+    yield
+    usage.reset_usage()
+    dl.reset_degradations()
+
+
+# Test that the pipeline retrieves with the rewritten question and answers the original one
+def test_answer_question_success():
+    requests = []
+    matches = [{"id": "a", "score": 0.8, "metadata": {"text": "Ana runs Peru", "source_url": "url-a"}}]
+    answer = asyncio.run(fast_qa.answer_question("Who runs Peru?", make_client(matches, requests)))
+
+    assert answer == "final answer"
+    paths = [path for path, _ in requests]
+    assert paths == ["/v1/chat/completions", "/v1/embeddings", "/query", "/v1/chat/completions"]
+    assert requests[1][1]["input"] == "rewritten question"
+    answer_messages = requests[3][1]["messages"]
+    assert "Ana runs Peru" in answer_messages[0]["content"]
+    assert answer_messages[1] == {"role": "user", "content": "Who runs Peru?"}
+    assert usage.get_usage_report()["answer"]["input_tokens"] == 100
+
+
+# Test that matches below the normalized score threshold are dropped and the stop message is returned
+def test_answer_question_without_context():
+    requests = []
+    matches = [{"id": "a", "score": 0.2, "metadata": {"text": "unrelated", "source_url": "url-a"}}]
+    answer = asyncio.run(fast_qa.answer_question("Who runs Peru?", make_client(matches, requests)))
+
+    assert answer == STOP_MESSAGE
+    assert [path for path, _ in requests].count("/v1/chat/completions") == 1
+
+
+# Test that the text metadata field becomes the page content of the chunk
+def test_retrieve_splits_text_from_metadata():
+    matches = [{"id": "a", "score": 0.9, "metadata": {"text": "content", "source_url": "url-a"}}]
+    chunks = asyncio.run(fast_qa.retrieve(make_client(matches, []), "question"))
+    assert chunks[0].page_content == "content"
+    assert chunks[0].metadata == {"source_url": "url-a"}
+
+
+# Test that run_fast_qa_chatbot raises ValueError when question is empty
+def test_run_fast_qa_chatbot_empty_question():
+    with pytest.raises(ValueError):
+        fast_qa.run_fast_qa_chatbot("")
+
+
+def make_slow_client(rewrite_delay=0.0, search_delay=0.0, token_delay=0.0):
+    matches = [{"id": "a", "score": 0.8, "metadata": {"text": "Ana runs Peru", "source_url": "url-a"}}]
+
+    async def answer_stream():
+        for token in ["Ana ", "runs ", "Peru"]:
+            await asyncio.sleep(token_delay)
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': token}}]})}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request):
+        body = json.loads(request.content)
+        if request.url.path.endswith("/chat/completions") and body.get("stream"):
+            return httpx.Response(200, content=answer_stream())
+        if request.url.path.endswith("/chat/completions"):
+            await asyncio.sleep(rewrite_delay)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "rewritten question"}}]})
+        if request.url.path.endswith("/embeddings"):
+            return httpx.Response(200, json={"data": [{"embedding": [0.1, 0.2]}]})
+        await asyncio.sleep(search_delay)
+        return httpx.Response(200, json={"matches": matches})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+# Test that the streamed answer is returned complete when every stage fits in the deadline
+def test_answer_with_deadline_no_degradation():
+    answer = asyncio.run(fast_qa.answer_question_with_deadline("Who runs Peru?", make_slow_client(), dl.Deadline(30)))
+    assert answer == "Ana runs Peru"
+    assert dl.get_degradation_report() == {}
+
+
+# Test that a slow rewrite is skipped and a slow search falls back to the cached context
+def test_answer_with_deadline_skips_slow_stages(monkeypatch):
+    monkeypatch.setattr(dl, "REWRITE_BUDGET_S", 0.3)
+    monkeypatch.setattr(dl, "RETRIEVE_BUDGET_S", 0.3)
+    monkeypatch.setattr(dl, "TIGHT_DEADLINE_S", 60)
+    dl.get_context_cache().put("Who runs Peru?", "{'page_content': 'cached', 'url': 'url-a'}")
+    client = make_slow_client(rewrite_delay=5, search_delay=5)
+
+    started = time.monotonic()
+    answer = asyncio.run(fast_qa.answer_question_with_deadline("Who runs Peru?", client, dl.Deadline(30)))
+
+    assert answer == "Ana runs Peru"
+    assert time.monotonic() - started < 2
+    assert dl.get_degradation_report() == {"rewrite_skipped": 1, "cached_context": 1}
+
+
+# Test that the answer stream is cut at the deadline and the partial answer is returned
+def test_answer_with_deadline_truncates_answer(monkeypatch):
+    monkeypatch.setattr(dl, "ANSWER_MIN_S", 0.1)
+    answer = asyncio.run(fast_qa.answer_question_with_deadline(
+        "Who runs Peru?", make_slow_client(token_delay=0.4), dl.Deadline(1.0)))
+
+    assert answer.startswith("Ana ") and answer.endswith(dl.TRUNCATED_SUFFIX)
+    assert dl.get_degradation_report()["answer_truncated"] == 1
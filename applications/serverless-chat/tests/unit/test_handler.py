@@ -43,5 +43,27 @@ def test_lambda_handler_valid_question(mocker):
     assert ret["statusCode"] == 200
     assert "message" in ret["body"]
     assert data["message"] == "Mocked response"
-    mock_run_qa_chatbot.assert_called_once_with("What is the capital of France?")
+    mock_run_qa_chatbot.assert_called_once_with("What is the capital of France?", deadline=None)
     mock_run_qa_chatbot.assert_called_once()
+
+
+# Test that the deadline passed to the chatbot is the earliest of the Lambda deadline and the client SLA
+def test_lambda_handler_deadline(mocker):
+    mock_run_qa_chatbot = mocker.patch("chat_app.app.run_qa_chatbot", return_value="Mocked response")
+    mocker.patch("chat_app.app.configure_local_env_vars", return_value=None)
+    context = mocker.Mock()
+    context.get_remaining_time_in_millis.return_value = 180000
+
+    event = {"body": json.dumps({"question": "What is the capital of France?", "sla_ms": 5000})}
+    ret = app.lambda_handler(event, context)
+
+    assert ret["statusCode"] == 200
+    deadline = mock_run_qa_chatbot.call_args.kwargs["deadline"]
+    assert 4 < deadline.remaining() <= 5
+
+
+# Test that an invalid client SLA is rejected
+def test_lambda_handler_invalid_sla():
+    ret = app.lambda_handler({"body": json.dumps({"question": "What is the capital of France?", "sla_ms": "fast"})}, "")
+    assert ret["statusCode"] == 400
+    assert "sla_ms" in json.loads(ret["body"])["message"]
@@ -11,6 +11,7 @@ sys.modules['langchain_openai'] = MagicMock()
 sys.modules['langchain_pinecone'] = MagicMock()
 sys.modules['langchain_core.runnables'] = MagicMock()
 sys.modules['langchain_core.messages'] = MagicMock()
+sys.modules['langchain_core.documents'] = MagicMock()
 sys.modules['langchain_core.prompts'] = MagicMock()
 sys.modules['langchain_core.tracers.langchain'] = MagicMock()
 
@@ -69,3 +70,98 @@ def test_stop_step_fn():
     msg = qa_chat.stop_step_fn({})
     assert hasattr(msg, "content")
     assert "enough information" in msg.content
+
+
+# Test that hydrate_matches applies the normalized score threshold and skips ids missing from the store
+def test_hydrate_matches():
+    doc_store = MagicMock()
+    doc_store.get.side_effect = lambda chunk_id: None if chunk_id == "missing" else ("text", {"source_url": "url"})
+    matches = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.1}, {"id": "missing", "score": 0.95}]
+    docs = qa_chat.hydrate_matches(matches, doc_store, score_threshold=0.7)
+    assert len(docs) == 1
+    doc_store.get.assert_any_call("a")
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = None
+        self.response_metadata = {}
+
+    def __add__(self, other):
+        return FakeChunk(self.content + other.content)
+
+
+# Test that run_qa_with_deadline skips a slow rewrite, retrieves with the original question and streams the answer
+@patch("chat_app.qa_chat.get_retriever")
+def test_run_qa_with_deadline_skips_slow_rewrite(mock_get_retriever, monkeypatch):
+    import time
+    from chat_app import deadline as dl
+    monkeypatch.setattr(dl, "REWRITE_BUDGET_S", 0.3)
+    monkeypatch.setattr(dl, "TIGHT_DEADLINE_S", 60)
+    dl.reset_degradations()
+
+    rewrite_chain = MagicMock()
+    rewrite_chain.invoke.side_effect = lambda question: time.sleep(2)
+    retriever = MagicMock()
+    doc = MagicMock(page_content="content", metadata={"source_url": "url"})
+    retriever.invoke.return_value = [doc]
+    mock_get_retriever.return_value = retriever
+    call_llm = MagicMock()
+    call_llm.stream.return_value = iter([FakeChunk("Test "), FakeChunk("answer")])
+
+    result = qa_chat.run_qa_with_deadline("What is AI?", dl.Deadline(30), rewrite_chain, call_llm)
+
+    assert result == "Test answer"
+    retriever.invoke.assert_called_once_with("What is AI?")
+    assert dl.get_degradation_report() == {"rewrite_skipped": 1}
+    dl.reset_degradations()
+
+
+# Test that a retrieval slower than its limit still answers when the deadline is not tight
+@patch("chat_app.qa_chat.get_retriever")
+def test_run_qa_with_deadline_slow_retrieval_with_time_left(mock_get_retriever, monkeypatch):
+    import time
+    from chat_app import deadline as dl
+    monkeypatch.setattr(dl, "RETRIEVE_BUDGET_S", 0.2)
+    monkeypatch.setattr(dl, "TIGHT_DEADLINE_S", 5)
+    dl.reset_degradations()
+
+    rewrite_chain = MagicMock()
+    rewrite_chain.invoke.return_value = MagicMock(content="AI definition")
+    retriever = MagicMock()
+    doc = MagicMock(page_content="content", metadata={"source_url": "url"})
+    retriever.invoke.side_effect = lambda question: time.sleep(0.5) or [doc]
+    mock_get_retriever.return_value = retriever
+    call_llm = MagicMock()
+    call_llm.stream.return_value = iter([FakeChunk("Test answer")])
+
+    result = qa_chat.run_qa_with_deadline("What is AI?", dl.Deadline(30), rewrite_chain, call_llm)
+
+    assert result == "Test answer"
+    mock_get_retriever.assert_called_once_with(3, 0.7)
+    assert dl.get_degradation_report() == {}
+
+
+# Test that the answer request is never sent when retrieval used up the deadline
+@patch("chat_app.qa_chat.get_retriever")
+def test_run_qa_with_deadline_expired_skips_answer(mock_get_retriever, monkeypatch):
+    import time
+    from chat_app import deadline as dl
+    monkeypatch.setattr(dl, "ANSWER_MIN_S", 0)
+    monkeypatch.setattr(dl, "TIGHT_DEADLINE_S", 0)
+    monkeypatch.setattr(dl, "_context_cache", None)
+    dl.reset_degradations()
+    dl.get_context_cache().put("What is AI?", "{'page_content': 'cached', 'url': 'url'}")
+
+    retriever = MagicMock()
+    retriever.invoke.side_effect = lambda question: time.sleep(1) or []
+    mock_get_retriever.return_value = retriever
+    call_llm = MagicMock()
+
+    result = qa_chat.run_qa_with_deadline("What is AI?", dl.Deadline(0.4), MagicMock(), call_llm)
+
+    assert result == dl.TIMEOUT_MESSAGE
+    call_llm.stream.assert_not_called()
+    assert dl.get_degradation_report()["answer_skipped"] == 1
+    dl.reset_degradations()
@@ -0,0 +1,89 @@
+# Unit tests for rewriter.py
+import json
+import pytest
+from unittest.mock import MagicMock
+
+import requests
+
+# Mock external dependencies to avoid import errors and real API calls
+import sys
+sys.modules['langchain_core.messages'] = MagicMock()
+sys.modules['langchain_core.runnables'] = MagicMock()
+sys.modules['langchain_core.prompts'] = MagicMock()
+
+from chat_app import rewriter
+
+
+def stream_lines(*contents):
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': c}}]})}" for c in contents]
+    return lines + ["", "data: [DONE]"]
+
+
+def mock_session(lines=None, side_effect=None):
+    session = MagicMock()
+    response = session.post.return_value.__enter__.return_value
+    response.iter_lines.return_value = lines or []
+    if side_effect:
+        session.post.side_effect = side_effect
+    return session
+
+
+# Test that parse_stream_line handles content, keep-alive and done lines
+def test_parse_stream_line():
+    assert rewriter.parse_stream_line(stream_lines("Hi")[0]) == "Hi"
+    assert rewriter.parse_stream_line("") == ""
+    assert rewriter.parse_stream_line(": keep-alive") == ""
+    assert rewriter.parse_stream_line("data: [DONE]") is None
+
+
+# Test that stream_chat_completion joins the streamed deltas and requests streaming
+def test_stream_chat_completion():
+    session = mock_session(stream_lines("What is ", "the onboarding process?"))
+    result = rewriter.stream_chat_completion([{"role": "user", "content": "q"}], session=session)
+    assert result == "What is the onboarding process?"
+    assert session.post.call_args.kwargs["json"]["stream"] is True
+    assert session.post.call_args.kwargs["timeout"] == rewriter.LM_STUDIO_TIMEOUT
+
+
+# Test that the remote chain is not called when the local model answers
+def test_rewrite_with_fallback_local():
+    remote_chain = MagicMock()
+    session = mock_session(stream_lines("What are the core values?"))
+    rewriter.rewrite_with_fallback("Tell me the values", remote_chain, session=session)
+    remote_chain.invoke.assert_not_called()
+
+
+# Test that the remote chain is used when the local model times out
+def test_rewrite_with_fallback_timeout():
+    remote_chain = MagicMock()
+    remote_chain.invoke.return_value = "remote"
+    session = mock_session(side_effect=requests.Timeout("slow"))
+    assert rewriter.rewrite_with_fallback("question", remote_chain, session=session) == "remote"
+    remote_chain.invoke.assert_called_once_with("question")
+
+
+# Test that the remote chain is used when the local server returns an error status
+def test_rewrite_with_fallback_http_error():
+    remote_chain = MagicMock()
+    remote_chain.invoke.return_value = "remote"
+    session = mock_session()
+    response = session.post.return_value.__enter__.return_value
+    response.raise_for_status.side_effect = requests.HTTPError("404 Client Error: model not loaded")
+    assert rewriter.rewrite_with_fallback("question", remote_chain, session=session) == "remote"
+    remote_chain.invoke.assert_called_once_with("question")
+
+
+# Test that the remote chain is used when the local server streams a malformed line
+def test_rewrite_with_fallback_malformed_stream():
+    remote_chain = MagicMock()
+    session = mock_session(["data: {not json"])
+    rewriter.rewrite_with_fallback("question", remote_chain, session=session)
+    remote_chain.invoke.assert_called_once_with("question")
+
+
+# Test that the remote chain is used when the local model returns an empty rewrite
+def test_rewrite_with_fallback_empty():
+    remote_chain = MagicMock()
+    session = mock_session(stream_lines(" "))
+    rewriter.rewrite_with_fallback("question", remote_chain, session=session)
+    remote_chain.invoke.assert_called_once_with("question")
@@ -0,0 +1,194 @@
+# Unit tests for session_history.py, the cached and compressed DynamoDB chat history
+import json
+import sys
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+# test_qa replaces LangChain modules with mocks, the history classes need the real messages
+for name in [name for name, module in sys.modules.items() if isinstance(module, MagicMock)]:
+    if name.startswith("langchain_core."):
+        del sys.modules[name]
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+from langchain_core.messages import AIMessage, HumanMessage, messages_to_dict  # noqa: E402
+
+from chat_app import session_history as sh  # noqa: E402
+
+
+class FakeTable:
+    """In memory stand-in for a DynamoDB table keyed by SessionId, records the keys it reads.
+    Transactions are applied all or nothing, before_write runs before each one."""
+    name = "ChatBotSessionTable"
+
+    def __init__(self, before_write=None):
+        self.items = {}
+        self.reads = []
+        self.transactions = 0
+        self.before_write = before_write
+        self.meta = SimpleNamespace(client=self)
+
+    def get_item(self, Key, ConsistentRead=False):
+        self.reads.append(Key["SessionId"])
+        item = self.items.get(Key["SessionId"])
+        return {"Item": dict(item)} if item else {}
+
+    def transact_write_items(self, TransactItems):
+        if self.before_write:
+            self.before_write(self)
+        self.transactions += 1
+        deserializer = TypeDeserializer()
+        puts, reasons = [], []
+        for operation in TransactItems:
+            put = operation["Put"]
+            item = {name: deserializer.deserialize(value) for name, value in put["Item"].items()}
+            current = self.items.get(item["SessionId"])
+            expected = put.get("ExpressionAttributeValues", {}).get(":expected")
+            failed = expected is not None and current is not None and "Version" in current \
+                and current["Version"] != deserializer.deserialize(expected)
+            reasons.append({"Code": "ConditionalCheckFailed" if failed else "None"})
+            puts.append(item)
+        if any(reason["Code"] != "None" for reason in reasons):
+            raise ClientError({"Error": {"Code": "TransactionCanceledException"}, "CancellationReasons": reasons},
+                              "TransactWriteItems")
+        for item in puts:
+            self.items[item["SessionId"]] = item
+
+    def delete_item(self, Key):
+        self.items.pop(Key["SessionId"], None)
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    sh.reset_session_cache_stats()
+    yield
+    sh.reset_session_cache_stats()
+
+
+def turn(table, cache, session_id, text):
+    history = sh.CachedDynamoDBChatMessageHistory(session_id=session_id, table=table, cache=cache)
+    messages = history.messages
+    history.add_messages([HumanMessage(content=text), AIMessage(content=f"answer to {text}")])
+    return messages
+
+
+# Test that payloads round trip through the available codecs
+def test_encode_decode_roundtrip():
+    messages = messages_to_dict([HumanMessage(content="hola " * 100), AIMessage(content="¿qué tal?")])
+    payload, encoding = sh.encode_messages(messages)
+    assert len(payload) < len(str(messages))
+    assert sh.decode_messages(payload, encoding) == messages
+
+
+# Test that a session served by the same container only reads the small version item
+def test_warm_session_skips_full_read():
+    table, cache = FakeTable(), sh.SessionCache()
+    turn(table, cache, "s1", "first")
+    table.reads.clear()
+
+    messages = turn(table, cache, "s1", "second")
+
+    assert [m.content for m in messages] == ["first", "answer to first"]
+    assert table.reads == ["s1" + sh.VERSION_KEY_SUFFIX]
+    assert sh.get_session_cache_stats()["cache_hits"] == 1
+
+
+# Test that a version written by another container triggers a full read
+def test_stale_cache_reads_full_history():
+    table, cache_a, cache_b = FakeTable(), sh.SessionCache(), sh.SessionCache()
+    turn(table, cache_a, "s1", "first")
+    turn(table, cache_b, "s1", "second")
+
+    messages = turn(table, cache_a, "s1", "third")
+
+    assert [m.content for m in messages][-1] == "answer to second"
+    assert table.items["s1"]["Version"] == 3
+
+
+# Test that a concurrent write is detected and the new messages are appended to the latest history
+def test_write_conflict_appends_to_latest():
+    table, cache_a, cache_b = FakeTable(), sh.SessionCache(), sh.SessionCache()
+    turn(table, cache_a, "s1", "first")
+    history = sh.CachedDynamoDBChatMessageHistory(session_id="s1", table=table, cache=cache_a)
+    history.messages
+    turn(table, cache_b, "s1", "concurrent")
+
+    history.add_messages([HumanMessage(content="late")])
+
+    contents = [m.content for m in turn(table, cache_a, "s1", "next")]
+    assert contents[-3:] == ["concurrent", "answer to concurrent", "late"]
+    assert sh.get_session_cache_stats()["write_conflicts"] == 1
+
+
+# Test that sessions written as a plain History list are read and upgraded, numbers come back as Decimal
+def test_reads_legacy_history_items():
+    table = FakeTable()
+    usage = {"input_tokens": 120, "output_tokens": 8, "total_tokens": 128}
+    legacy = messages_to_dict([HumanMessage(content="old"), AIMessage(
+        content="old answer", usage_metadata=usage,
+        response_metadata={"token_usage": {"prompt_tokens": 120, "completion_tokens": 8}, "logprobs": 0.5})])
+    serialized = TypeSerializer().serialize(json.loads(json.dumps(legacy), parse_float=Decimal))
+    table.items["s1"] = {"SessionId": "s1", "History": TypeDeserializer().deserialize(serialized)}
+
+    messages = turn(table, sh.SessionCache(), "s1", "new")
+
+    assert [m.content for m in messages] == ["old", "old answer"]
+    assert messages[1].usage_metadata == usage
+    assert messages[1].response_metadata["logprobs"] == 0.5
+    assert "History" not in table.items["s1"] and table.items["s1"]["Version"] == 1
+
+
+# Test that the history and its version item are written together or not at all
+def test_history_and_version_written_together():
+    table = FakeTable()
+    turn(table, sh.SessionCache(), "s1", "first")
+    assert table.items["s1"]["Version"] == table.items["s1" + sh.VERSION_KEY_SUFFIX]["Version"] == 1
+
+    def fail(table):
+        raise ClientError({"Error": {"Code": "InternalServerError"}}, "TransactWriteItems")
+
+    table.before_write = fail
+    with pytest.raises(ClientError):
+        turn(table, sh.SessionCache(), "s1", "second")
+    assert table.items["s1"]["Version"] == table.items["s1" + sh.VERSION_KEY_SUFFIX]["Version"] == 1
+
+
+# Test that repeated conflicts are retried a bounded number of times
+@pytest.mark.parametrize("conflicts, succeeds", [(sh.MAX_WRITE_ATTEMPTS - 1, True), (sh.MAX_WRITE_ATTEMPTS, False)])
+def test_write_conflict_retries_are_bounded(conflicts, succeeds):
+    table = FakeTable()
+    turn(table, sh.SessionCache(), "s1", "first")
+    remaining = {"conflicts": conflicts}
+
+    def concurrent_turn(table):
+        # Another container writes a turn right before each of our attempts
+        if remaining["conflicts"]:
+            remaining["conflicts"] -= 1
+            table.before_write = None
+            turn(table, sh.SessionCache(), "s1", "other")
+            table.before_write = concurrent_turn
+
+    history = sh.CachedDynamoDBChatMessageHistory(session_id="s1", table=table, cache=sh.SessionCache())
+    history.messages
+    table.before_write = concurrent_turn
+    if succeeds:
+        history.add_messages([HumanMessage(content="mine")])
+        assert table.items["s1"]["Version"] == conflicts + 2
+    else:
+        with pytest.raises(ClientError):
+            history.add_messages([HumanMessage(content="mine")])
+    assert sh.get_session_cache_stats()["write_conflicts"] == min(conflicts, sh.MAX_WRITE_ATTEMPTS - 1)
+
+
+# Test that the cache evicts the least recently used sessions above its byte limit
+def test_session_cache_byte_bound():
+    cache = sh.SessionCache(max_bytes=10)
+    cache.put("a", sh.CachedSession(1, b"12345", "zlib+json"))
+    cache.put("b", sh.CachedSession(1, b"12345", "zlib+json"))
+    cache.get("a")
+    cache.put("c", sh.CachedSession(1, b"123", "zlib+json"))
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.size == 8
@@ -0,0 +1,57 @@
+# Unit tests for usage.py and the prompt cache layout
+import pytest
+from unittest.mock import MagicMock
+
+from chat_app import usage
+from chat_app.prompts import chatbot_prompt_text
+
+
+@pytest.fixture(autouse=True)
+def clean_usage():
+    usage.reset_usage()
+    yield
+    usage.reset_usage()
+
+
+def message(usage_metadata=None, response_metadata=None):
+    msg = MagicMock()
+    msg.usage_metadata = usage_metadata
+    msg.response_metadata = response_metadata or {}
+    return msg
+
+
+# Test that cached tokens are read from the normalized usage_metadata
+def test_get_token_usage_from_usage_metadata():
+    msg = message({"input_tokens": 1200, "output_tokens": 50, "input_token_details": {"cache_read": 1024}})
+    assert usage.get_token_usage(msg) == {"input_tokens": 1200, "cached_tokens": 1024, "output_tokens": 50}
+
+
+# Test that cached tokens are read from the raw OpenAI token_usage when usage_metadata is missing
+def test_get_token_usage_from_response_metadata():
+    msg = message(response_metadata={"token_usage": {
+        "prompt_tokens": 2000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 1536}}})
+    assert usage.get_token_usage(msg) == {"input_tokens": 2000, "cached_tokens": 1536, "output_tokens": 10}
+
+
+# Test that messages without usage data are ignored
+def test_record_usage_without_usage():
+    usage.record_usage("answer", None)
+    assert usage.get_usage_report() == {}
+
+
+# Test that the cache hit ratio is accumulated per stage
+def test_cache_hit_ratio_per_stage():
+    usage.record_usage("answer", message({"input_tokens": 1000, "output_tokens": 5}))
+    usage.record_usage("answer", message({"input_tokens": 1000, "output_tokens": 5,
+                                          "input_token_details": {"cache_read": 1000}}))
+    usage.record_usage("rewrite", message({"input_tokens": 300, "output_tokens": 5}))
+    report = usage.get_usage_report()
+    assert report["answer"]["calls"] == 2
+    assert report["answer"]["cache_hit_ratio"] == 0.5
+    assert report["rewrite"]["cache_hit_ratio"] == 0.0
+
+
+# Test that the retrieved context comes after the static rules so the prompt prefix is stable
+def test_chatbot_prompt_context_after_rules():
+    assert chatbot_prompt_text.index("Rules:") < chatbot_prompt_text.index("{context}")
+    assert chatbot_prompt_text.rstrip().endswith("{context}")
@@ -0,0 +1,74 @@
+# Unit tests for vector_index.py
+import numpy as np
+import pytest
+
+from chat_app.vector_index import VectorIndex, VectorIndexWriter, reduce_dimensions
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return reduce_dimensions(rng.normal(size=(500, 64)), 64)
+
+
+@pytest.fixture
+def index_path(tmp_path, vectors):
+    with VectorIndexWriter(str(tmp_path), dimensions=64) as writer:
+        for i, vector in enumerate(vectors):
+            writer.add(f"id-{i}", vector)
+    return str(tmp_path)
+
+
+# Test that reduce_dimensions truncates and re-normalizes the vectors
+def test_reduce_dimensions():
+    reduced = reduce_dimensions([[3.0, 4.0, 12.0]], 2)
+    assert reduced.shape == (1, 2)
+    assert np.allclose(reduced, [[0.6, 0.8]])
+
+
+# Test that every quantization finds the vector itself as the best match with its exact score
+@pytest.mark.parametrize("quantization", ["float32", "int8", "binary"])
+def test_search_finds_query_vector(index_path, vectors, quantization):
+    index = VectorIndex(index_path, quantization=quantization)
+    matches = index.search(vectors[42], k=3)
+    assert len(matches) == 3
+    assert matches[0]["id"] == "id-42"
+    assert matches[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert [m["score"] for m in matches] == sorted((m["score"] for m in matches), reverse=True)
+
+
+# Test that int8 search with rescoring matches the exact top k on random queries
+def test_int8_recall(index_path, vectors):
+    exact = VectorIndex(index_path, quantization="float32")
+    int8 = VectorIndex(index_path, quantization="int8", rescore_multiplier=8)
+    queries = reduce_dimensions(np.random.default_rng(1).normal(size=(20, 64)), 64)
+    hits = sum(len({m["id"] for m in exact.search(q, 5)} & {m["id"] for m in int8.search(q, 5)}) for q in queries)
+    assert hits / (20 * 5) >= 0.9
+
+
+# Test that the codes are smaller than the full precision vectors
+def test_code_bytes(index_path):
+    assert VectorIndex(index_path, quantization="int8").code_bytes() == 500 * 64
+    assert VectorIndex(index_path, quantization="binary").code_bytes() == 500 * 8
+
+
+# Test that an empty index returns no matches and unknown quantizations are rejected
+def test_empty_index_and_invalid_quantization(tmp_path):
+    VectorIndexWriter(str(tmp_path), dimensions=8).close()
+    assert VectorIndex(str(tmp_path)).search(np.ones(8), k=3) == []
+    with pytest.raises(ValueError):
+        VectorIndex(str(tmp_path), quantization="pq")
+
+
+# Test that a local index without a doc store is rejected when the retrieval settings are loaded
+def test_local_index_requires_doc_store(monkeypatch, index_path):
+    import importlib.util
+    from pathlib import Path
+
+    monkeypatch.setenv("LOCAL_INDEX_PATH", index_path)
+    monkeypatch.delenv("DOC_STORE_PATH", raising=False)
+    # Loaded under another name so the retrieval module used by the other tests is untouched
+    spec = importlib.util.spec_from_file_location(
+        "retrieval_settings_check", Path(__file__).resolve().parents[2] / "chat_app" / "retrieval.py")
+    with pytest.raises(ValueError, match="DOC_STORE_PATH"):
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
@@ -0,0 +1,102 @@
+"""
+Peak memory and chunks/sec of the streaming loader + TokenChunker against the
+notebook ingestion path (json.load + RecursiveCharacterTextSplitter.from_tiktoken_encoder).
+
+The Confluence export is replicated --copies times into a temporary file to simulate a large corpus.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_chunking --copies 50
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from rag_ingestion.chunking import TokenChunker, chunk_pages
+from rag_ingestion.loaders import iter_pages
+from rag_ingestion.pinecone_ingest import batched
+
+CONFLUENCE_FILE = "resources_rag/cf_bts_pages.json"
+
+
+def build_corpus(copies: int) -> str:
+    with open(CONFLUENCE_FILE, encoding="utf-8") as file:
+        pages = json.load(file)
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        file.write("[")
+        for copy in range(copies):
+            for i, page in enumerate(pages):
+                if copy or i:
+                    file.write(",")
+                json.dump({**page, "page_id": f"{page['page_id']}-{copy}"}, file)
+        file.write("]")
+    return path
+
+
+def langchain_ingestion(path: str, chunk_size: int) -> int:
+    """The ingestion of 05-RAG-part-3.1: everything is materialized before upserting."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_core.documents import Document
+
+    with open(path, "r") as file:
+        confluence_data = json.load(file)
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        model_name="text-embedding-3-small", chunk_size=chunk_size, chunk_overlap=0)
+    chunks_by_page = {}
+    for item in confluence_data:
+        content = item.get("content", "")
+        if content:
+            chunks = text_splitter.split_text(content)
+            chunks_by_page[item["page_id"]] = [
+                Document(page_content=chunk, metadata={"source": "confluence",
+                                                       "title": item.get("title", ""),
+                                                       "page_id": item.get("page_id", ""),
+                                                       "source_url": item.get("source_url", "")})
+                for chunk in chunks if chunk.strip()
+            ]
+    documents = [doc for docs in chunks_by_page.values() for doc in docs]
+    return len(documents)
+
+
+def streaming_ingestion(path: str, chunk_size: int) -> int:
+    """Pages and chunks are generated lazily and consumed in upsert sized batches."""
+    chunker = TokenChunker(chunk_size=chunk_size)
+    total = 0
+    for batch in batched(chunk_pages(iter_pages(path), chunker), 100):
+        total += len(batch)
+    return total
+
+
+def measure(name: str, fn, path: str, chunk_size: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    chunks = fn(path, chunk_size)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} chunks={chunks:<7} time={elapsed:7.2f}s chunks/sec={chunks / elapsed:9.1f} "
+          f"peak={peak / 2**20:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    path = build_corpus(args.copies)
+    try:
+        print(f"corpus: {os.path.getsize(path) / 2**20:.1f} MiB ({args.copies} copies of {CONFLUENCE_FILE})")
+        # Load the tiktoken encoding once so its download/cache is not part of either measurement
+        TokenChunker(chunk_size=args.chunk_size)
+        measure("langchain", langchain_ingestion, path, args.chunk_size)
+        measure("streaming", streaming_ingestion, path, args.chunk_size)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
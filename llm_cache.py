@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+DEFAULT_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "512")) * 2**20)
+# "auto" caches deterministic calls (temperature 0), "all" caches every call, "off" disables the cache
+CACHE_MODE = os.getenv("LLM_CACHE", "auto")
+# Temperature in a LangChain llm_string: JSON of the model ("temperature": 0.0) or repr of the call params ('temperature', 0.7)
+_LLM_STRING_TEMPERATURE = re.compile(r"""["']temperature["']\s*[:,]\s*([^,}\])]+)""")
+
+
+class LLMCache:
+    """Disk backed exact match cache of LLM responses stored in SQLite.
+    Each thread uses its own connection and the database runs in WAL mode, so the cache
+    can be shared by the thread pool fan-out in execute_prompt and by several processes.
+    When the stored responses exceed max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS responses ("
+                               "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            connection.execute("CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO stats VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM responses))")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(provider: str, request: dict) -> str:
+        """Build the cache key of a request.
+        Args:
+            provider (str): The provider name.
+            request (dict): Everything that changes the response: model, messages, temperature, output format.
+        Returns:
+            str: Hex sha256 digest.
+        """
+        payload = json.dumps([provider, request], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Get a cached response and mark it as recently used.
+        Args:
+            key (str): The cache key.
+        Returns:
+            The cached response or None.
+        """
+        with self._connection() as connection:
+            row = connection.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value):
+        """Store a response, evicting the least recently used entries when the cache is full.
+        Args:
+            key (str): The cache key.
+            value: The JSON serializable response.
+        """
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        with self._connection() as connection:
+            row = connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, data, size, time.time()))
+            connection.execute("UPDATE stats SET total = total + ? WHERE id = 0", (size - (row[0] if row else 0),))
+            total = connection.execute("SELECT total FROM stats WHERE id = 0").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(connection, total)
+
+    def _evict(self, connection: sqlite3.Connection, total: int):
+        # Evict down to 90% of the limit so eviction does not run on every put
+        target = int(self.max_bytes * 0.9)
+        while total > target:
+            rows = connection.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 100").fetchall()
+            if not rows:
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                total -= size
+                if total <= target:
+                    break
+            connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        connection.execute("UPDATE stats SET total = (SELECT COALESCE(SUM(size), 0) FROM responses) WHERE id = 0")
+
+    def size(self) -> int:
+        """Get the bytes used by the stored responses.
+        Returns:
+            int: The total size of the stored responses.
+        """
+        return self._connection().execute("SELECT total FROM stats WHERE id = 0").fetchone()[0]
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM responses")
+            connection.execute("UPDATE stats SET total = 0 WHERE id = 0")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """Get the process wide cache, created on first use.
+    Returns:
+        LLMCache: The cache.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+    return _cache
+
+
+def should_cache(request: dict, use_cache: bool = None) -> bool:
+    """Decide if a request is served from the cache.
+    Args:
+        request (dict): The request, its temperature decides in auto mode.
+        use_cache (bool, optional): True or False overrides the automatic decision.
+    Returns:
+        bool: True if the cache is used.
+    """
+    if CACHE_MODE == "off" or use_cache is False:
+        return False
+    if use_cache or CACHE_MODE == "all":
+        return True
+    # Responses sampled with a temperature are not reproducible, only cache greedy decoding.
+    # A request without a temperature uses the provider default, which samples
+    return request.get("temperature") == 0
+
+
+def cached_completion(provider: str, request: dict, call, use_cache: bool = None):
+    """Return the cached response of the request, or call the provider and cache its response.
+    Args:
+        provider (str): The provider name, part of the cache key.
+        request (dict): The request sent to the provider, the rest of the cache key.
+        call (callable): Function without arguments that calls the provider.
+        use_cache (bool, optional): Force (True) or skip (False) the cache, by default only
+            requests with temperature 0 are cached.
+    Returns:
+        The provider response.
+    """
+    if not should_cache(request, use_cache):
+        return call()
+    cache = get_cache()
+    key = cache.key(provider, request)
+    response = cache.get(key)
+    if response is None:
+        response = call()
+        cache.put(key, response)
+    return response
+
+
+def llm_string_temperature(llm_string: str):
+    """Read the temperature of a LangChain call from its llm_string.
+    Args:
+        llm_string (str): The model and call parameters LangChain passes to the cache.
+    Returns:
+        float: The temperature of the call, None when it is not set or not a number.
+    """
+    # Parameters bound to the call come after the model, so the last value wins
+    values = _LLM_STRING_TEMPERATURE.findall(llm_string)
+    try:
+        return float(values[-1]) if values else None
+    except ValueError:
+        return None
+
+
+def enable_langchain_cache(cache: LLMCache = None):
+    """Serve LangChain chat model calls from the same response cache, for notebook flows
+    that use ChatOpenAI(temperature=0). Like cached_completion, only calls with temperature 0
+    are cached unless LLM_CACHE=all. Models created with cache=False bypass it.
+    Args:
+        cache (LLMCache, optional): The cache, defaults to the process wide cache.
+    """
+    from langchain_core.caches import BaseCache
+    from langchain_core.globals import set_llm_cache
+    from langchain_core.load import dumps, loads
+
+    store = cache or get_cache()
+
+    class LangChainCache(BaseCache):
+        def lookup(self, prompt, llm_string):
+            if not should_cache({"temperature": llm_string_temperature(llm_string)}):
+                return None
+            value = store.get(store.key("langchain", {"prompt": prompt, "llm": llm_string}))
+            return None if value is None else [loads(generation) for generation in value]
+
+        def update(self, prompt, llm_string, return_val):
+            if not should_cache({"temperature": llm_string_temperature(llm_string)}):
+                return
+            store.put(store.key("langchain", {"prompt": prompt, "llm": llm_string}),
+                      [dumps(generation) for generation in return_val])
+
+        def clear(self, **kwargs):
+            store.clear()
+
+    set_llm_cache(None if CACHE_MODE == "off" else LangChainCache())
@@ -0,0 +1,110 @@
+from bisect import bisect_left
+from typing import Iterable, Iterator, Sequence
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+class TokenChunker:
+    """Token aware text chunker.
+    Each text is tokenized once, chunks are cut on token offsets and the cut is moved
+    back to the latest preferred separator inside the window, so chunks keep the same
+    token limits as RecursiveCharacterTextSplitter.from_tiktoken_encoder without
+    re-tokenizing the text for every candidate split.
+    """
+
+    def __init__(self, model_name: str = "text-embedding-3-small", chunk_size: int = 500,
+                 chunk_overlap: int = 0, separators: Sequence[str] = DEFAULT_SEPARATORS,
+                 min_chunk_ratio: float = 0.5, encoding=None):
+        """
+        Args:
+            model_name (str): Model used to pick the tiktoken encoding.
+            chunk_size (int): Maximum tokens per chunk.
+            chunk_overlap (int): Tokens shared by consecutive chunks.
+            separators (Sequence[str]): Cut points in order of preference.
+            min_chunk_ratio (float): A separator is only used if the chunk keeps at least
+                this fraction of chunk_size tokens, otherwise the next separator is tried.
+            encoding (optional): A tiktoken encoding, defaults to the one of model_name.
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        if encoding is None:
+            import tiktoken
+            encoding = tiktoken.encoding_for_model(model_name)
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators
+        self.min_chunk_tokens = max(1, int(chunk_size * min_chunk_ratio))
+
+    def split_text(self, text: str) -> Iterator[str]:
+        """Yield the chunks of a text.
+        Args:
+            text (str): The text to split.
+        Returns:
+            Iterator[str]: The stripped, non empty chunks.
+        """
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if not tokens:
+            return
+        decoded, offsets = self.encoding.decode_with_offsets(tokens)
+        count = len(tokens)
+        start = 0
+        while start < count:
+            end = min(start + self.chunk_size, count)
+            if end < count:
+                end = self._align(tokens, self._find_cut(decoded, offsets, start, end), start)
+            char_end = offsets[end] if end < count else len(decoded)
+            chunk = decoded[offsets[start]:char_end].strip()
+            if chunk:
+                yield chunk
+            if end >= count:
+                return
+            start = self._align(tokens, max(end - self.chunk_overlap, start + 1), start)
+
+    def _align(self, tokens: list, index: int, floor: int) -> int:
+        """Move a cut back to the closest token that starts a character, staying after floor.
+        Byte level encodings can split a multi-byte character over several tokens, and the
+        offset of such a token is the start of its character, so cutting there would make
+        the chunk longer than the tokens it was measured on."""
+        aligned = index
+        while aligned > floor + 1 and not self._starts_character(tokens[aligned]):
+            aligned -= 1
+        return aligned if self._starts_character(tokens[aligned]) else index
+
+    def _starts_character(self, token: int) -> bool:
+        # UTF-8 continuation bytes look like 0b10xxxxxx
+        return (self.encoding.decode_single_token_bytes(token)[0] & 0xC0) != 0x80
+
+    def _find_cut(self, text: str, offsets: list, start: int, end: int) -> int:
+        """Return the token index to end the chunk at, preferring the latest separator."""
+        window_start = offsets[start + self.min_chunk_tokens]
+        window_end = offsets[end]
+        for separator in self.separators:
+            position = text.rfind(separator, window_start, window_end)
+            if position != -1:
+                # First token starting after the separator, always inside (start, end]
+                return bisect_left(offsets, position + len(separator), start + 1, end)
+        return end
+
+
+def chunk_pages(pages: Iterable[dict], chunker: TokenChunker, source: str = "confluence") -> Iterator:
+    """Yield one LangChain document per chunk, consuming the pages lazily.
+    Args:
+        pages (Iterable[dict]): Pages like the ones yielded by rag_ingestion.loaders.iter_pages.
+        chunker (TokenChunker): The chunker.
+        source (str): Value of the source metadata field.
+    Returns:
+        Iterator[Document]: The chunks with the same metadata used in 05-RAG-part-3.1.
+    """
+    from langchain_core.documents import Document
+
+    for page in pages:
+        content = page.get("content", "")
+        if not content:
+            continue
+        metadata = {"source": source,
+                    "title": page.get("title", ""),
+                    "page_id": page.get("page_id", ""),
+                    "source_url": page.get("source_url", "")}
+        for chunk in chunker.split_text(content):
+            yield Document(page_content=chunk, metadata=dict(metadata))
@@ -0,0 +1,86 @@
+import json
+import os
+from typing import Iterator, TextIO
+
+READ_SIZE = 1 << 16
+
+
+def iter_json_array(file: TextIO, read_size: int = READ_SIZE) -> Iterator:
+    """Yield the items of a top level JSON array one at a time.
+    Only the item being decoded and one read buffer are kept in memory.
+    Args:
+        file (TextIO): The open JSON file.
+        read_size (int): Characters read from the file at a time.
+    Returns:
+        Iterator: The decoded items.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    # After "[" an item or "]" may follow, after "," only an item, after an item "," or "]"
+    expect_item, allow_end = True, True
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if buffer:
+                if buffer[0] != "[":
+                    raise ValueError("Expected a JSON array")
+                buffer = buffer[1:]
+                started = True
+                continue
+        elif buffer.startswith("]"):
+            if not allow_end:
+                raise ValueError("Expected a JSON value after ','")
+            return
+        elif buffer.startswith(","):
+            if expect_item:
+                raise ValueError("Expected a JSON value before ','")
+            buffer = buffer[1:]
+            expect_item, allow_end = True, False
+            continue
+        elif buffer:
+            if not expect_item:
+                raise ValueError(f"Expected ',' or ']' after a JSON array item, found {buffer[:20]!r}")
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # Only accept the item once the next character was read, a number at the
+                # end of the buffer may continue in the next read
+                rest = buffer[end:].lstrip()
+                if rest or eof:
+                    yield item
+                    buffer = rest
+                    expect_item, allow_end = False, True
+                    continue
+        if eof:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        data = file.read(read_size)
+        eof = not data
+        buffer += data
+
+
+def iter_pages(path: str) -> Iterator[dict]:
+    """Yield the pages of a corpus file one at a time.
+    Supported formats: a JSON array of pages (like cf_bts_pages.json), JSON lines with
+    one page per line, and plain text files (one page per file).
+    Args:
+        path (str): The corpus file.
+    Returns:
+        Iterator[dict]: Pages with page_id, title, content and source_url keys.
+    """
+    with open(path, encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        elif path.endswith(".json"):
+            yield from iter_json_array(file)
+        else:
+            name = os.path.basename(path)
+            yield {"page_id": name, "title": name, "content": file.read(), "source_url": ""}
@@ -0,0 +1,174 @@
+import os
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Sequence
+from uuid import uuid4
+
+SERVERLESS_CHAT_DIR = Path(__file__).resolve().parents[1] / "applications" / "serverless-chat"
+
+
+def get_vector_store(index_name: str = "rag-class", embedding_model: str = "text-embedding-3-small"):
+    """Create the Pinecone vector store used by the RAG classes and the serverless chat.
+    Args:
+        index_name (str): The Pinecone index name.
+        embedding_model (str): The OpenAI embedding model.
+    Returns:
+        PineconeVectorStore: The vector store.
+    """
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_pinecone import PineconeVectorStore
+
+    embeddings = OpenAIEmbeddings(model=embedding_model)
+    return PineconeVectorStore(index=get_index(index_name), embedding=embeddings)
+
+
+def get_index(index_name: str = "rag-class"):
+    """Get a client for a Pinecone index.
+    Args:
+        index_name (str): The Pinecone index name.
+    Returns:
+        pinecone.Index: The index client.
+    """
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
+    return pc.Index(index_name)
+
+
+def batched(iterable: Iterable, size: int):
+    """Yield lists of at most size items without materializing the iterable.
+    Args:
+        iterable (Iterable): The items to group.
+        size (int): The batch size.
+    Returns:
+        Iterator[list]: The batches.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def upsert_documents(vector_store, documents: Iterable, batch_size: int = 100) -> int:
+    """Add documents to the vector store in batches, consuming the input lazily.
+    Args:
+        vector_store (VectorStore): The target vector store.
+        documents (Iterable[Document]): The documents, a list or a generator.
+        batch_size (int): Documents embedded and upserted per request.
+    Returns:
+        int: The number of upserted documents.
+    """
+    total = 0
+    for batch in batched(documents, batch_size):
+        vector_store.add_documents(documents=batch, ids=[str(uuid4()) for _ in batch])
+        total += len(batch)
+        print(f"Upserted {total} documents")
+    return total
+
+
+def get_doc_store_writer(path: str):
+    """Create a writer for the chunk text store read by the serverless chat (chat_app.doc_store).
+    Args:
+        path (str): The store directory.
+    Returns:
+        DocStoreWriter: The writer, to be closed once every chunk was added.
+    """
+    if str(SERVERLESS_CHAT_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVERLESS_CHAT_DIR))
+    from chat_app.doc_store import DocStoreWriter
+    return DocStoreWriter(path)
+
+
+def get_vector_index_writer(path: str, dimensions: int):
+    """Create a writer for the local quantized vector index (chat_app.vector_index).
+    Args:
+        path (str): The index directory.
+        dimensions (int): The embedding dimensions.
+    Returns:
+        VectorIndexWriter: The writer, to be closed once every vector was added.
+    """
+    if str(SERVERLESS_CHAT_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVERLESS_CHAT_DIR))
+    from chat_app.vector_index import VectorIndexWriter
+    return VectorIndexWriter(path, dimensions)
+
+
+def upsert_ids_only(index, embeddings, documents: Iterable, doc_store_writer, batch_size: int = 100,
+                    filter_fields: Sequence[str] = ("source", "page_id"), vector_index_writer=None) -> int:
+    """Upsert vectors with only the ids and filter fields as metadata, and write the
+    chunk texts and full metadata to the local doc store.
+    Args:
+        index (pinecone.Index): The Pinecone index, None to only write the local stores.
+        embeddings (Embeddings): The embedding model.
+        documents (Iterable[Document]): The documents, a list or a generator.
+        doc_store_writer (DocStoreWriter): The doc store the texts are written to.
+        batch_size (int): Documents embedded and upserted per request.
+        filter_fields (Sequence[str]): Metadata fields kept in the index for filtering.
+        vector_index_writer (VectorIndexWriter, optional): Local vector index the vectors are also written to.
+    Returns:
+        int: The number of upserted documents.
+    """
+    total = 0
+    for batch in batched(documents, batch_size):
+        ids = [str(uuid4()) for _ in batch]
+        vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+        if index is not None:
+            index.upsert(vectors=[
+                (chunk_id, vector, {key: doc.metadata[key] for key in filter_fields if key in doc.metadata})
+                for chunk_id, vector, doc in zip(ids, vectors, batch)
+            ])
+        for chunk_id, vector, doc in zip(ids, vectors, batch):
+            doc_store_writer.add(chunk_id, doc.page_content, doc.metadata)
+            if vector_index_writer is not None:
+                vector_index_writer.add(chunk_id, vector)
+        total += len(batch)
+        print(f"Upserted {total} documents")
+    return total
+
+
+def main():
+    import argparse
+    from rag_ingestion.chunking import TokenChunker, chunk_pages
+    from rag_ingestion.loaders import iter_pages
+
+    parser = argparse.ArgumentParser(description="Stream corpus files into the Pinecone index.")
+    parser.add_argument("paths", nargs="+", help="JSON, JSONL or text files")
+    parser.add_argument("--index", default="rag-class")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--doc-store", help="Keep chunk texts in this local doc store, the index only gets ids")
+    parser.add_argument("--local-index", help="Also write a local quantized vector index (requires --doc-store)")
+    parser.add_argument("--local-only", action="store_true", help="Do not upsert to Pinecone")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding dimensions requested from the API")
+    args = parser.parse_args()
+    # The local index only holds vectors, the texts it points to live in the doc store
+    if args.local_index and not args.doc_store:
+        parser.error("--local-index requires --doc-store")
+    if args.local_only and not args.doc_store:
+        parser.error("--local-only requires --doc-store")
+
+    chunker = TokenChunker(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    if args.doc_store:
+        from langchain_openai import OpenAIEmbeddings
+        index = None if args.local_only else get_index(args.index)
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=args.dimensions)
+        vector_index_writer = get_vector_index_writer(args.local_index, args.dimensions) if args.local_index else None
+        with get_doc_store_writer(args.doc_store) as writer:
+            for path in args.paths:
+                documents = chunk_pages(iter_pages(path), chunker)
+                upsert_ids_only(index, embeddings, documents, writer, args.batch_size,
+                                vector_index_writer=vector_index_writer)
+        if vector_index_writer is not None:
+            vector_index_writer.close()
+        return
+    vector_store = get_vector_store(args.index)
+    for path in args.paths:
+        documents = chunk_pages(iter_pages(path), chunker)
+        upsert_documents(vector_store, documents, args.batch_size)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List
+
+from pydantic import BaseModel
+
+PROPOSITION_PROMPT = "wfh/proposal-indexing"
+DEFAULT_CACHE_PATH = ".cache/propositions.jsonl"
+
+
+class Sentences(BaseModel):
+    sentences: List[str]
+
+
+@dataclass
+class Paragraph:
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+
+def get_proposition_runnable(model: str = "gpt-4.1-nano"):
+    """Build the proposition extraction runnable used in 05-RAG-part-2.
+    Args:
+        model (str): The OpenAI model used to extract the propositions.
+    Returns:
+        Runnable: prompt | llm with structured output, returning Sentences.
+    """
+    from langchain import hub
+    from langchain_openai import ChatOpenAI
+
+    obj = hub.pull(PROPOSITION_PROMPT)
+    llm = ChatOpenAI(model=model, temperature=0).with_structured_output(Sentences)
+    return obj | llm
+
+
+def paragraph_key(text: str, model: str) -> str:
+    """Cache key of a paragraph, the content hash salted with the prompt and model.
+    Args:
+        text (str): The paragraph text.
+        model (str): The model used to extract the propositions.
+    Returns:
+        str: Hex sha256 digest.
+    """
+    return hashlib.sha256(f"{PROPOSITION_PROMPT}\0{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class PropositionCache:
+    """Append-only JSONL cache of extracted propositions keyed by paragraph hash.
+    Every result is flushed as soon as it is written, so the file doubles as the
+    checkpoint of an interrupted run.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            with open(path, "rb+") as file:
+                data = file.read()
+                # A partially written last line means the previous run was killed mid write,
+                # it is cut off so the next append starts on a line of its own
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    file.truncate(complete)
+            for line in data[:complete].decode("utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._entries[entry["key"]] = entry["sentences"]
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        return self._entries.get(key)
+
+    def put(self, key: str, sentences: List[str]):
+        with self._lock:
+            self._entries[key] = sentences
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps({"key": key, "sentences": sentences}, ensure_ascii=False) + "\n")
+
+
+def split_paragraphs(text: str, metadata: dict = None) -> List[Paragraph]:
+    """Split a text into non empty paragraphs.
+    Args:
+        text (str): The text to split on blank lines.
+        metadata (dict, optional): Metadata copied into every paragraph.
+    Returns:
+        List[Paragraph]: The paragraphs with their position in the text.
+    """
+    paragraphs = [p.strip() for p in text.split("\n\n")]
+    return [Paragraph(p, {**(metadata or {}), "paragraph": i})
+            for i, p in enumerate(paragraphs) if p]
+
+
+def load_corpus_paragraphs(path: str) -> List[Paragraph]:
+    """Load the paragraphs of a plain text file or of a Confluence pages JSON export.
+    Args:
+        path (str): Path to a .txt file or a JSON list of pages (like cf_bts_pages.json).
+    Returns:
+        List[Paragraph]: The paragraphs with source metadata.
+    """
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as file:
+            pages = json.load(file)
+        paragraphs = []
+        for page in pages:
+            metadata = {"source": "confluence", "title": page.get("title", ""),
+                        "page_id": page.get("page_id", ""), "source_url": page.get("source_url", "")}
+            paragraphs.extend(split_paragraphs(page.get("content", ""), metadata))
+        return paragraphs
+    with open(path, encoding="utf-8") as file:
+        return split_paragraphs(file.read(), {"source": os.path.basename(path)})
+
+
+def extract_propositions(paragraphs: List[Paragraph], runnable=None, cache: PropositionCache = None,
+                         model: str = "gpt-4.1-nano", max_concurrency: int = 8,
+                         max_retries: int = 2, log_every: int = 10) -> List[List[str]]:
+    """Extract the propositions of every paragraph with bounded concurrency.
+    Cached paragraphs are not sent to the model. Paragraphs that keep failing after
+    max_retries are returned as an empty list and are not cached, so the next run retries them.
+    Args:
+        paragraphs (List[Paragraph]): The paragraphs to process.
+        runnable (Runnable, optional): The extraction runnable. Defaults to get_proposition_runnable(model).
+        cache (PropositionCache, optional): The persistent cache. Defaults to DEFAULT_CACHE_PATH.
+        model (str): The model name, part of the cache key.
+        max_concurrency (int): Maximum number of in flight model calls.
+        max_retries (int): Retries per paragraph on errors (rate limits, timeouts).
+        log_every (int): Print progress every log_every processed paragraphs.
+    Returns:
+        List[List[str]]: The propositions of each paragraph, in input order.
+    """
+    cache = cache if cache is not None else PropositionCache()
+    keys = [paragraph_key(p.text, model) for p in paragraphs]
+    results = [cache.get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    print(f"{len(paragraphs)} paragraphs, {len(paragraphs) - len(pending)} cached, {len(pending)} to extract")
+    if not pending:
+        return results
+    runnable = runnable or get_proposition_runnable(model)
+
+    def extract(index: int) -> List[str]:
+        for attempt in range(max_retries + 1):
+            try:
+                return list(runnable.invoke({"input": paragraphs[index].text}).sentences)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                print(f"Retrying paragraph {index} after error: {e}")
+                time.sleep(2 ** attempt)
+
+    started = time.perf_counter()
+    done = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {executor.submit(extract, i): i for i in pending}
+        for future in concurrent.futures.as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+                cache.put(keys[index], results[index])
+            except Exception as e:
+                print(f"Failed paragraph {index}: {e}")
+                results[index] = []
+            done += 1
+            if done % log_every == 0 or done == len(pending):
+                rate = done / (time.perf_counter() - started)
+                print(f"Done {done}/{len(pending)} ({rate:.2f} paragraphs/sec)")
+    return results
+
+
+def propositions_to_documents(paragraphs: List[Paragraph], propositions: List[List[str]]) -> Iterable:
+    """Turn the extracted propositions into LangChain documents for the vector store.
+    Args:
+        paragraphs (List[Paragraph]): The processed paragraphs.
+        propositions (List[List[str]]): The propositions of each paragraph.
+    Returns:
+        Iterable[Document]: One document per proposition with its paragraph metadata.
+    """
+    from langchain_core.documents import Document
+
+    for paragraph, sentences in zip(paragraphs, propositions):
+        for sentence in sentences:
+            if sentence.strip():
+                yield Document(page_content=sentence, metadata={**paragraph.metadata, "chunking": "proposition"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proposition based chunking of text corpora.")
+    parser.add_argument("paths", nargs="+", help="Text files or Confluence JSON exports")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--model", default="gpt-4.1-nano")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--upsert", action="store_true", help="Upsert the propositions to Pinecone")
+    parser.add_argument("--index", default="rag-class")
+    args = parser.parse_args()
+
+    cache = PropositionCache(args.cache)
+    runnable = None
+    for path in args.paths:
+        paragraphs = load_corpus_paragraphs(path)
+        started = time.perf_counter()
+        if any(paragraph_key(p.text, args.model) not in cache for p in paragraphs):
+            runnable = runnable or get_proposition_runnable(args.model)
+        propositions = extract_propositions(paragraphs, runnable, cache, args.model, args.concurrency)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        total = sum(len(p) for p in propositions)
+        print(f"{path}: {len(paragraphs)} paragraphs -> {total} propositions in {elapsed:.1f}s "
+              f"({len(paragraphs) / elapsed:.2f} paragraphs/sec)")
+        if args.upsert:
+            from rag_ingestion.pinecone_ingest import get_vector_store, upsert_documents
+            upsert_documents(get_vector_store(args.index), propositions_to_documents(paragraphs, propositions))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -9,6 +9,7 @@ from google import genai
 from google.genai.types import HttpOptions, ModelContent, Part, UserContent
 from dataclasses import dataclass
 import re
+from llm_cache import cached_completion
 load_dotenv()
 
 
@@ -17,6 +18,8 @@ class ChatParams:
     system_role_message: str = None
     temperature: float = 0.7
     expected_output_format: any = None
+    # None caches only deterministic calls (temperature 0), True or False forces or skips the response cache
+    use_cache: bool = None
 
 
 def hf_chat(content: str, params: ChatParams):
@@ -26,10 +29,6 @@ def hf_chat(content: str, params: ChatParams):
     Returns:
         dict: The response from the model.
     """
-    client = InferenceClient(
-        provider="cohere",
-        api_key=os.environ["HF_TOKEN"],
-    )
     messages = []
     if params.system_role_message:
         messages.append({
@@ -40,14 +39,22 @@ def hf_chat(content: str, params: ChatParams):
         "role": "user",
         "content": content
     })
-    completion = client.chat.completions.create(
-        model="CohereLabs/c4ai-command-r-plus",
-        temperature=params.temperature,
-        messages=messages,
-        # response_format=params.expected_output_format,
-    )
+    request = {
+        "model": "CohereLabs/c4ai-command-r-plus",
+        "temperature": params.temperature,
+        "messages": messages,
+        # "response_format": params.expected_output_format,
+    }
+
+    def call():
+        client = InferenceClient(
+            provider="cohere",
+            api_key=os.environ["HF_TOKEN"],
+        )
+        completion = client.chat.completions.create(**request)
+        return completion.choices[0].message.content
 
-    return completion.choices[0].message.content
+    return cached_completion("hf", request, call, params.use_cache)
 
 
 def openai_chat(content: str, params: ChatParams):
@@ -59,7 +66,6 @@ def openai_chat(content: str, params: ChatParams):
         str: The response from the model.
     """
 
-    client = OpenAI()
     messages = []
     if params.system_role_message:
         messages.append({
@@ -91,9 +97,12 @@ def openai_chat(content: str, params: ChatParams):
             }
         }
 
-    completion = client.chat.completions.create(**completion_args)
+    def call():
+        client = OpenAI()
+        completion = client.chat.completions.create(**completion_args)
+        return completion.choices[0].message.content
 
-    response_content = completion.choices[0].message.content
+    response_content = cached_completion("openai", completion_args, call, params.use_cache)
 
     # Si hay un formato de salida esperado, limpiar la respuesta JSON
     if params.expected_output_format:
@@ -0,0 +1,6 @@
+import sys
+import os
+
+# Add the repository root to Python path so tests can import rag_ingestion and llm_cache
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
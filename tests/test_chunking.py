@@ -0,0 +1,78 @@
+# Unit tests for rag_ingestion/chunking.py
+import pytest
+import tiktoken
+
+from rag_ingestion.chunking import TokenChunker, chunk_pages
+
+# One token per byte, built in memory so the tests do not download an encoding.
+# Multi-byte characters span several tokens, like rare characters do with cl100k_base.
+BYTE_ENCODING = tiktoken.Encoding("bytes", pat_str=r"\S+|\s+",
+                                  mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={})
+
+TEXT = ("The onboarding process has three steps. " * 6 + "\n\n"
+        + "Core values guide every project.\nPeople come first. " * 5 + "\n\n"
+        + "Año café ñandú, 日本語のテキスト。" * 8)
+
+
+def chunker(**kwargs):
+    return TokenChunker(encoding=BYTE_ENCODING, **kwargs)
+
+
+def token_count(text: str) -> int:
+    return len(BYTE_ENCODING.encode(text))
+
+
+# Test that no chunk exceeds chunk_size tokens and the chunks cover the whole text in order
+@pytest.mark.parametrize("chunk_size", [16, 37, 100])
+def test_chunks_within_size(chunk_size):
+    chunks = list(chunker(chunk_size=chunk_size).split_text(TEXT))
+    assert max(token_count(chunk) for chunk in chunks) <= chunk_size
+    assert "".join(chunks).replace(" ", "").replace("\n", "") == TEXT.replace(" ", "").replace("\n", "")
+
+
+# Test that consecutive chunks share text when chunk_overlap is set, without exceeding the size
+def test_chunk_overlap():
+    chunks = list(chunker(chunk_size=60, chunk_overlap=20).split_text(TEXT))
+    assert max(token_count(chunk) for chunk in chunks) <= 60
+    for previous, current in zip(chunks, chunks[1:]):
+        assert any(previous.endswith(current[:n]) for n in range(5, len(current)))
+    assert len(chunks) > len(list(chunker(chunk_size=60).split_text(TEXT)))
+
+
+# Test that cuts prefer the paragraph separator, then the line separator, over words
+def test_separator_preference():
+    text = "a" * 30 + "\n\n" + "b" * 10 + "\n" + "c" * 10 + " " + "d" * 30
+    chunks = list(chunker(chunk_size=50, min_chunk_ratio=0.5).split_text(text))
+    assert chunks[0] == "a" * 30
+    chunks = list(chunker(chunk_size=50, min_chunk_ratio=0.7).split_text(text))
+    assert chunks[0] == "a" * 30 + "\n\n" + "b" * 10
+
+
+# Test that the cut falls back to the token limit when no separator is in the window
+def test_cut_without_separator():
+    assert list(chunker(chunk_size=10).split_text("x" * 25)) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+# Test that multi-byte characters are never split, with or without overlap
+@pytest.mark.parametrize("chunk_overlap", [0, 3, 7])
+def test_multibyte_characters(chunk_overlap):
+    text = "日本語のテキスト。ñandú" * 20
+    chunks = list(chunker(chunk_size=16, chunk_overlap=chunk_overlap).split_text(text))
+    assert all(chunk in text for chunk in chunks)
+    assert max(token_count(chunk) for chunk in chunks) <= 16
+
+
+# Test that the overlap must be smaller than the chunk size
+def test_invalid_overlap():
+    with pytest.raises(ValueError):
+        chunker(chunk_size=10, chunk_overlap=10)
+
+
+# Test that chunk_pages skips empty pages and copies the page metadata into every chunk
+def test_chunk_pages_metadata():
+    pages = [{"page_id": "1", "title": "T", "content": "word " * 40, "source_url": "https://wiki/1"},
+             {"page_id": "2", "title": "Empty", "content": ""}]
+    documents = list(chunk_pages(pages, chunker(chunk_size=50)))
+    assert len(documents) == 4
+    assert all(d.metadata == {"source": "confluence", "title": "T", "page_id": "1", "source_url": "https://wiki/1"}
+               for d in documents)
@@ -0,0 +1,151 @@
+# Unit tests for llm_cache.py
+import threading
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "cache" / "llm.sqlite3"), max_bytes=1000)
+
+
+@pytest.fixture
+def shared_cache(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    return cache
+
+
+# Test that stored responses are returned and the key covers the provider and the request
+def test_put_get(cache):
+    key = cache.key("openai", {"model": "m", "messages": [{"role": "user", "content": "¿hola?"}]})
+    assert cache.get(key) is None
+    cache.put(key, {"text": "¡hola!"})
+    assert cache.get(key) == {"text": "¡hola!"}
+    assert key != cache.key("gemini", {"model": "m", "messages": [{"role": "user", "content": "¿hola?"}]})
+    assert cache.key("openai", {"a": 1, "b": 2}) == cache.key("openai", {"b": 2, "a": 1})
+
+
+# Test that the size accounting follows inserts, replacements and clear, and survives a reopen
+def test_size_accounting(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMCache(path)
+    cache.put("a", "x" * 100)
+    cache.put("b", "y" * 50)
+    assert cache.size() == 102 + 52
+    cache.put("a", "x" * 10)
+    assert cache.size() == 12 + 52
+    assert LLMCache(path).size() == 12 + 52
+    cache.clear()
+    assert cache.size() == 0 and cache.get("b") is None
+
+
+# Test that the least recently used entries are evicted down to 90% of the limit
+def test_lru_eviction(cache, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+    for key in "abcd":
+        cache.put(key, "v" * 198)  # 200 bytes once JSON encoded
+    cache.get("a")
+    cache.put("e", "v" * 198)
+    cache.put("f", "v" * 198)
+
+    assert cache.get("b") is None and cache.get("c") is None
+    assert all(cache.get(key) is not None for key in "adef")
+    assert cache.size() == 800 <= cache.max_bytes * 0.9
+
+
+# Test that every thread gets its own connection and concurrent puts keep the total consistent
+def test_thread_local_connections(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    connections = set()
+
+    def work(worker: int):
+        connections.add(id(cache._connection()))
+        for i in range(25):
+            cache.put(f"{worker}-{i}", f"response {worker} {i}")
+            assert cache.get(f"{worker}-{i}") == f"response {worker} {i}"
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(connections) == 8
+    count, total = cache._connection().execute("SELECT COUNT(*), SUM(size) FROM responses").fetchone()
+    assert count == 200 and cache.size() == total
+
+
+# Test the automatic caching rules and their overrides
+@pytest.mark.parametrize("mode, request_, use_cache, expected", [
+    ("auto", {"temperature": 0}, None, True),
+    ("auto", {"temperature": 0.7}, None, False),
+    ("auto", {}, None, False),  # provider default temperature samples
+    ("auto", {"temperature": 0.7}, True, True),
+    ("auto", {"temperature": 0}, False, False),
+    ("all", {"temperature": 0.7}, None, True),
+    ("all", {}, False, False),
+    ("off", {"temperature": 0}, True, False),
+])
+def test_should_cache(monkeypatch, mode, request_, use_cache, expected):
+    monkeypatch.setattr(llm_cache, "CACHE_MODE", mode)
+    assert llm_cache.should_cache(request_, use_cache) is expected
+
+
+# Test that cached_completion calls the provider once per request and skips uncached requests
+def test_cached_completion(monkeypatch, shared_cache):
+    monkeypatch.setattr(llm_cache, "CACHE_MODE", "auto")
+    calls = []
+
+    def call():
+        calls.append(1)
+        return f"response {len(calls)}"
+
+    request = {"model": "m", "messages": [], "temperature": 0}
+    assert llm_cache.cached_completion("openai", request, call) == "response 1"
+    assert llm_cache.cached_completion("openai", request, call) == "response 1"
+    assert llm_cache.cached_completion("openai", {**request, "temperature": 1}, call) == "response 2"
+    assert llm_cache.cached_completion("openai", {**request, "temperature": 1}, call) == "response 3"
+    assert llm_cache.cached_completion("openai", request, call, use_cache=False) == "response 4"
+
+
+# Test that the temperature is read from both llm_string formats, the call parameters winning
+@pytest.mark.parametrize("llm_string, expected", [
+    ('{"kwargs": {"model_name": "gpt-4.1-nano", "temperature": 0.0}}---[(\'stop\', None)]', 0.0),
+    ('{"kwargs": {"temperature": 0.0}}---[(\'stop\', None), (\'temperature\', 0.7)]', 0.7),
+    ("[('_type', 'fake'), ('stop', None), ('temperature', 1)]", 1.0),
+    ("[('_type', 'fake'), ('stop', None)]", None),
+])
+def test_llm_string_temperature(llm_string, expected):
+    assert llm_cache.llm_string_temperature(llm_string) == expected
+
+
+# Test that the LangChain adapter caches greedy calls only, unless every call is cached
+@pytest.mark.parametrize("mode, temperature, cached", [
+    ("auto", 0, True),
+    ("auto", 0.7, False),
+    ("all", 0.7, True),
+])
+def test_langchain_cache(monkeypatch, cache, mode, temperature, cached):
+    from langchain_core.globals import set_llm_cache
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    class FakeChatModel(FakeListChatModel):
+        temperature: float
+
+        @property
+        def _identifying_params(self):
+            return {"temperature": self.temperature}
+
+    monkeypatch.setattr(llm_cache, "CACHE_MODE", mode)
+    llm_cache.enable_langchain_cache(cache)
+    try:
+        model = FakeChatModel(responses=["first", "second"], temperature=temperature)
+        assert model.invoke("hola").content == "first"
+        assert model.invoke("hola").content == ("first" if cached else "second")
+        assert (cache.size() > 0) is cached
+    finally:
+        set_llm_cache(None)
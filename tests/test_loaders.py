@@ -0,0 +1,56 @@
+# Unit tests for rag_ingestion/loaders.py
+import io
+import json
+
+import pytest
+
+from rag_ingestion import loaders
+
+PAGES = [
+    {"page_id": "1", "title": "Valores", "content": "Año, café y ñandú 日本語 \"quoted\" \\ [1, 2]", "source_url": ""},
+    {"page_id": "2", "title": "Numbers", "content": "", "values": [123456789, -1.5e10, True, None]},
+    {"page_id": "3", "title": "Empty", "content": "", "nested": {"a": [], "b": {}}},
+]
+
+
+# Test that items are decoded the same whatever the read size, so numbers, strings and
+# escapes split across reads are joined before decoding
+@pytest.mark.parametrize("read_size", [1, 2, 3, 7, 64, loaders.READ_SIZE])
+def test_iter_json_array_read_boundaries(read_size):
+    text = json.dumps(PAGES, ensure_ascii=False, indent=2)
+    assert list(loaders.iter_json_array(io.StringIO(text), read_size=read_size)) == PAGES
+
+
+# Test that top level numbers split across reads are not yielded early
+@pytest.mark.parametrize("read_size", [1, 2, 5])
+def test_iter_json_array_numbers(read_size):
+    assert list(loaders.iter_json_array(io.StringIO("[ 12345 ,678,\n9 ]"), read_size=read_size)) == [12345, 678, 9]
+
+
+# Test that empty arrays yield nothing
+@pytest.mark.parametrize("text", ["[]", "  [ \n ]  "])
+def test_iter_json_array_empty(text):
+    assert list(loaders.iter_json_array(io.StringIO(text), read_size=1)) == []
+
+
+# Test that missing, extra or leading delimiters and truncated arrays are rejected
+@pytest.mark.parametrize("text", ["[1 2]", "[1,]", "[,1]", "[1,,2]", '[{"a": 1} {"b": 2}]', "[1, 2", '[{"a": 1}', "{}"])
+@pytest.mark.parametrize("read_size", [1, 64])
+def test_iter_json_array_invalid(text, read_size):
+    with pytest.raises(ValueError):
+        list(loaders.iter_json_array(io.StringIO(text), read_size=read_size))
+
+
+# Test that JSON arrays, JSON lines and text files yield pages
+def test_iter_pages_formats(tmp_path):
+    json_path = tmp_path / "pages.json"
+    json_path.write_text(json.dumps(PAGES), encoding="utf-8")
+    jsonl_path = tmp_path / "pages.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(page) for page in PAGES) + "\n\n", encoding="utf-8")
+    text_path = tmp_path / "essay.txt"
+    text_path.write_text("Some text.", encoding="utf-8")
+
+    assert list(loaders.iter_pages(str(json_path))) == PAGES
+    assert list(loaders.iter_pages(str(jsonl_path))) == PAGES
+    assert list(loaders.iter_pages(str(text_path))) == [
+        {"page_id": "essay.txt", "title": "essay.txt", "content": "Some text.", "source_url": ""}]
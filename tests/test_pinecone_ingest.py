@@ -0,0 +1,15 @@
+# Unit tests for rag_ingestion/pinecone_ingest.py
+import sys
+
+import pytest
+
+from rag_ingestion import pinecone_ingest
+
+
+# Test that local index options without a doc store are rejected instead of ignored
+@pytest.mark.parametrize("options", [["--local-index", "index"], ["--local-only"]])
+def test_local_options_require_doc_store(monkeypatch, capsys, options):
+    monkeypatch.setattr(sys, "argv", ["pinecone_ingest", "pages.json", *options])
+    with pytest.raises(SystemExit):
+        pinecone_ingest.main()
+    assert "requires --doc-store" in capsys.readouterr().err
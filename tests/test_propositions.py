@@ -0,0 +1,146 @@
+# Unit tests for rag_ingestion/propositions.py
+import json
+import threading
+
+import pytest
+
+from rag_ingestion import propositions
+from rag_ingestion.propositions import Paragraph, PropositionCache, Sentences
+
+
+class FakeRunnable:
+    """Stands in for prompt | llm, returns one proposition per sentence of the paragraph.
+    Paragraphs listed in failures raise that many times before answering."""
+
+    def __init__(self, failures: dict = None):
+        self.failures = dict(failures or {})
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def invoke(self, inputs):
+        text = inputs["input"]
+        with self._lock:
+            self.calls.append(text)
+            if self.failures.get(text, 0) > 0:
+                self.failures[text] -= 1
+                raise RuntimeError("rate limited")
+        return Sentences(sentences=[s.strip() + "." for s in text.split(".") if s.strip()])
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(propositions.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PropositionCache(str(tmp_path / "cache" / "propositions.jsonl"))
+
+
+# Test that entries written by one cache are loaded by the next one
+def test_cache_persists_entries(tmp_path):
+    path = str(tmp_path / "propositions.jsonl")
+    PropositionCache(path).put("a", ["First.", "Segundo, ñandú."])
+    reloaded = PropositionCache(path)
+    assert "a" in reloaded and len(reloaded) == 1
+    assert reloaded.get("a") == ["First.", "Segundo, ñandú."]
+
+
+# Test that a truncated last line is dropped and the next entry is still readable
+def test_cache_recovers_from_truncated_last_line(tmp_path):
+    path = tmp_path / "propositions.jsonl"
+    path.write_text(json.dumps({"key": "a", "sentences": ["A."]}) + "\n" + '{"key": "b", "sente',
+                    encoding="utf-8")
+
+    cache = PropositionCache(str(path))
+    assert cache.get("a") == ["A."] and "b" not in cache
+    cache.put("c", ["C."])
+
+    reloaded = PropositionCache(str(path))
+    assert reloaded.get("a") == ["A."] and reloaded.get("c") == ["C."]
+    assert "b" not in reloaded
+
+
+# Test that concurrent puts write one complete line per entry
+def test_cache_put_is_thread_safe(cache):
+    threads = [threading.Thread(target=lambda i=i: [cache.put(f"{i}-{j}", ["x" * 500]) for j in range(50)])
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(cache.path, encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    assert len(lines) == 400
+    assert len(PropositionCache(cache.path)) == 400
+
+
+# Test that results keep the input order and cached paragraphs are not sent to the model
+def test_extract_propositions_skips_cached(cache):
+    paragraphs = [Paragraph(f"Fact {i}. Detail {i}.") for i in range(20)]
+    runnable = FakeRunnable()
+    cache.put(propositions.paragraph_key(paragraphs[3].text, "m"), ["cached"])
+
+    results = propositions.extract_propositions(paragraphs, runnable, cache, model="m", max_concurrency=4)
+
+    assert results[3] == ["cached"]
+    assert results[0] == ["Fact 0.", "Detail 0."] and results[19] == ["Fact 19.", "Detail 19."]
+    assert len(runnable.calls) == 19 and paragraphs[3].text not in runnable.calls
+    assert len(cache) == 20
+
+
+# Test that a paragraph failing fewer times than max_retries is retried and cached
+def test_extract_propositions_retries(cache):
+    paragraphs = [Paragraph("Flaky fact.")]
+    runnable = FakeRunnable(failures={"Flaky fact.": 2})
+
+    results = propositions.extract_propositions(paragraphs, runnable, cache, model="m", max_retries=2)
+
+    assert results == [["Flaky fact."]]
+    assert len(runnable.calls) == 3
+    assert propositions.paragraph_key("Flaky fact.", "m") in cache
+
+
+# Test that a paragraph that keeps failing returns no propositions and is not cached
+def test_extract_propositions_failed_not_cached(cache):
+    paragraphs = [Paragraph("Broken fact."), Paragraph("Good fact.")]
+    runnable = FakeRunnable(failures={"Broken fact.": 10})
+
+    results = propositions.extract_propositions(paragraphs, runnable, cache, model="m", max_retries=1)
+
+    assert results == [[], ["Good fact."]]
+    assert propositions.paragraph_key("Broken fact.", "m") not in cache
+    assert propositions.paragraph_key("Good fact.", "m") in cache
+
+
+# Test that the model name is part of the cache key
+def test_paragraph_key_depends_on_model():
+    assert propositions.paragraph_key("text", "a") != propositions.paragraph_key("text", "b")
+    assert propositions.paragraph_key("text", "a") == propositions.paragraph_key("text", "a")
+
+
+# Test that paragraphs are split on blank lines, empty ones dropped and positions kept
+def test_split_paragraphs():
+    paragraphs = propositions.split_paragraphs("One.\n\n  \n\nTwo\nlines.\n\n\n\nThree.", {"source": "s"})
+    assert [p.text for p in paragraphs] == ["One.", "Two\nlines.", "Three."]
+    assert [p.metadata["paragraph"] for p in paragraphs] == [0, 2, 4]
+    assert all(p.metadata["source"] == "s" for p in paragraphs)
+
+
+# Test that Confluence exports and text files are loaded with their source metadata
+def test_load_corpus_paragraphs(tmp_path):
+    pages = [{"title": "Values", "page_id": "1", "source_url": "https://wiki/1", "content": "A.\n\nB."},
+             {"title": "Empty", "page_id": "2", "source_url": "https://wiki/2", "content": ""}]
+    json_path = tmp_path / "pages.json"
+    json_path.write_text(json.dumps(pages), encoding="utf-8")
+    text_path = tmp_path / "notes.txt"
+    text_path.write_text("First.\n\nSecond.", encoding="utf-8")
+
+    from_json = propositions.load_corpus_paragraphs(str(json_path))
+    from_text = propositions.load_corpus_paragraphs(str(text_path))
+
+    assert [p.text for p in from_json] == ["A.", "B."]
+    assert from_json[1].metadata == {"source": "confluence", "title": "Values", "page_id": "1",
+                                     "source_url": "https://wiki/1", "paragraph": 1}
+    assert [p.text for p in from_text] == ["First.", "Second."]
+    assert from_text[0].metadata == {"source": "notes.txt", "paragraph": 0}
@@ -1,45 +1,72 @@
 import os
+import json
 import requests
+import requests.adapters
 from openai import OpenAI
 from dotenv import load_dotenv
 from huggingface_hub import InferenceClient
 from google import genai
+from llm_cache import cached_completion
 load_dotenv()
 
-def hf_chat(content: str):
+def hf_chat(content: str, use_cache: bool = None):
     """Call the Hugging Face Inference API to get a chat completion.
     Args:
         content (str): The user input to send to the model.
+        use_cache (bool, optional): Force (True) or skip (False) the response cache. The request
+            uses the provider default temperature, so by default it is not cached.
     Returns:
         dict: The response from the model.
     """
-    client = InferenceClient(
-        provider="cohere",
-        api_key=os.environ["HF_TOKEN"],
-    )
-
-    completion = client.chat.completions.create(
-        model="CohereLabs/c4ai-command-r-plus",
-        messages=[
+    request = {
+        "model": "CohereLabs/c4ai-command-r-plus",
+        "messages": [
             {
                 "role": "user",
                 "content": content
             }
         ],
-    )
+    }
+
+    def call():
+        client = InferenceClient(
+            provider="cohere",
+            api_key=os.environ["HF_TOKEN"],
+        )
+        completion = client.chat.completions.create(**request)
+        return completion.choices[0].message.content
+
+    return cached_completion("hf", request, call, use_cache)
 
-    return completion.choices[0].message.content
+LM_STUDIO_URL = "http://localhost:1234/v1/chat/completions"
+# (connect, read) timeouts in seconds, the read timeout applies between streamed chunks
+LM_STUDIO_TIMEOUT = (2, 60)
+_lm_studio_session = None
+
+
+def get_lm_studio_session() -> requests.Session:
+    """Return a shared requests session so calls to LM Studio reuse keep-alive connections.
+    Returns:
+        requests.Session: The pooled session.
+    """
+    global _lm_studio_session
+    if _lm_studio_session is None:
+        _lm_studio_session = requests.Session()
+        _lm_studio_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=8))
+        _lm_studio_session.headers.update({"Content-Type": "application/json"})
+    return _lm_studio_session
 
-def lm_studio_chat(content: str):
+
+def lm_studio_chat(content: str, use_cache: bool = None):
     """Call the LM Studio API (LOCAL) to get a chat completion.
     Args:
         content (str): The user input to send to the model.
+        use_cache (bool, optional): Force (True) or skip (False) the response cache. The request
+            uses the provider default temperature, so by default it is not cached.
     Returns:
         dict: The response from the model.
     """
 
-    url = "http://localhost:1234/v1/chat/completions"
-    headers = {"Content-Type": "application/json"}
     data = {
         "model": "gemma-3-4b-it",
         "messages": [
@@ -48,46 +75,69 @@ def lm_studio_chat(content: str):
         ],
         #"temperature": 0.7,
         "max_tokens": -1,
-        "stream": False
+        "stream": True
     }
 
-    response = requests.post(url, headers=headers, json=data)
-    return response.json()["choices"][0]["message"]["content"]
+    def call():
+        parts = []
+        with get_lm_studio_session().post(LM_STUDIO_URL, json=data, timeout=LM_STUDIO_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or [{}]
+                parts.append(choices[0].get("delta", {}).get("content") or "")
+        return "".join(parts)
+
+    return cached_completion("lm_studio", data, call, use_cache)
 
-def openai_chat(content: str):
+def openai_chat(content: str, use_cache: bool = None):
     """Call the OpenAI API to get a chat completion.
     Args:
         content (str): The user input to send to the model.
+        use_cache (bool, optional): Force (True) or skip (False) the response cache. The request
+            uses the provider default temperature, so by default it is not cached.
     Returns:
         dict: The response from the model.
     """
 
-    client = OpenAI()
-    completion = client.chat.completions.create(
-        model="gpt-4.1-nano",
-        messages=[
+    request = {
+        "model": "gpt-4.1-nano",
+        "messages": [
             {
                 "role": "user",
                 "content": content,
             },
         ],
-    )
+    }
 
-    return completion.choices[0].message.content
+    def call():
+        client = OpenAI()
+        completion = client.chat.completions.create(**request)
+        return completion.choices[0].message.content
 
-def gemini_chat(content: str):
+    return cached_completion("openai", request, call, use_cache)
+
+def gemini_chat(content: str, use_cache: bool = None):
     """Call the Gemini API to get a chat completion.
     Args:
         content (str): The user input to send to the model.
+        use_cache (bool, optional): Force (True) or skip (False) the response cache. The request
+            uses the provider default temperature, so by default it is not cached.
     Returns:
         dict: The response from the model.
     """
-    client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
-    
-    response = client.models.generate_content(
-        model="gemini-2.0-flash", contents=content
-    )
-    return response.text
+    request = {"model": "gemini-2.0-flash", "contents": content}
+
+    def call():
+        client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+        response = client.models.generate_content(**request)
+        return response.text
+
+    return cached_completion("gemini", request, call, use_cache)
 
 
 def build_prompt(prompt: str, resume: str = None) -> str: